@@ -1,8 +1,118 @@
 # pcost.py
 
+import bz2
+import gzip
+import io
+import lzma
+import queue
+import threading
+
+# Compressed file signatures and the function used to open them.  zstd
+# is only available if the running Python has compression.zstd.
+_openers = [ (b'\x1f\x8b', gzip.open),
+             (b'BZh', bz2.open),
+             (b'\xfd7zXZ\x00', lzma.open) ]
+try:
+    from compression import zstd
+    _openers.append((b'\x28\xb5\x2f\xfd', zstd.open))
+except ImportError:
+    pass
+
+def open_data(filename, *, threaded=False, blocksize=1024*1024):
+    '''
+    Open a data file as text, decompressing it if needed.  The file is
+    opened once and its signature peeked from the buffer, so pipes and
+    /dev/stdin work too.  Compressed data is read in blocks of blocksize
+    bytes, in a background thread if threaded is set.
+    '''
+    f = open(filename, 'rb')
+    magic = f.peek(6)[:6]
+    for signature, opener in _openers:
+        if magic.startswith(signature):
+            raw = DecompressedReader(opener(f, 'rb'), f)
+            if threaded:
+                raw = ThreadedReader(raw, blocksize)
+            return io.TextIOWrapper(io.BufferedReader(raw, blocksize))
+    return io.TextIOWrapper(f)
+
+class DecompressedReader(io.RawIOBase):
+    '''
+    Raw binary stream over a decompressing file that also closes the
+    file it reads from.
+    '''
+    def __init__(self, source, file):
+        self._source = source
+        self._file = file
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self._source.readinto(buffer)
+
+    def close(self):
+        if not self.closed:
+            self._source.close()
+            self._file.close()
+        super().close()
+
+class ThreadedReader(io.RawIOBase):
+    '''
+    Raw binary stream that reads blocks from another file in a
+    background thread.
+    '''
+    def __init__(self, source, blocksize, depth=4):
+        self._source = source
+        self._queue = queue.Queue(depth)
+        self._block = memoryview(b'')
+        self._eof = False
+        self._stop = False
+        self._thread = threading.Thread(target=self._produce, args=(blocksize,), daemon=True)
+        self._thread.start()
+
+    def _produce(self, blocksize):
+        try:
+            while not self._stop:
+                data = self._source.read(blocksize)
+                self._queue.put(data)
+                if not data:
+                    break
+        except Exception as e:
+            self._queue.put(e)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._block:
+            if self._eof:
+                return 0
+            data = self._queue.get()
+            if isinstance(data, Exception):
+                raise data
+            if not data:
+                self._eof = True
+                return 0
+            self._block = memoryview(data)
+        n = min(len(buffer), len(self._block))
+        buffer[:n] = self._block[:n]
+        self._block = self._block[n:]
+        return n
+
+    def close(self):
+        if not self.closed:
+            self._stop = True
+            while self._thread.is_alive():
+                try:
+                    self._queue.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            self._source.close()
+        super().close()
+
 def portfolio_cost(filename):
     total_cost = 0.0
-    with open(filename) as f:
+    with open_data(filename) as f:
         for line in f:
             fields = line.split()
             try:
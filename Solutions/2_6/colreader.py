@@ -1,7 +1,14 @@
 # colreader.py
 
+import array
 import collections
 import csv
+import sys
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 class DataCollection(collections.abc.Sequence):
     def __init__(self, columns):
@@ -24,7 +31,71 @@ def read_csv_as_columns(filename, types):
         for row in rows:
             for name, func, val in zip(headers, types, row):
                 columns[name].append(func(val))
-            
+
+    return DataCollection(columns)
+
+class EncodedColumn(collections.abc.Sequence):
+    '''
+    A column of strings stored as integer codes into a table of
+    the distinct values (dictionary encoding).
+    '''
+    def __init__(self, values=()):
+        self.values = []
+        self.codes = array.array('I')
+        self._lookup = { }
+        for value in values:
+            self.append(value)
+
+    def append(self, value):
+        code = self._lookup.get(value)
+        if code is None:
+            code = self._lookup[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [ self.values[code] for code in self.codes[index] ]
+        return self.values[self.codes[index]]
+
+# Storage used for each conversion function.  Anything not listed
+# here is kept in an ordinary list.
+_typecodes = { int: 'q', float: 'd' }
+_encoded = { str, sys.intern }
+
+def _make_column(func):
+    if func in _typecodes:
+        return array.array(_typecodes[func])
+    elif func in _encoded:
+        return EncodedColumn()
+    else:
+        return []
+
+def read_csv_as_typed_columns(filename, types, *, use_numpy=False):
+    '''
+    Read CSV data into columns.  int and float columns are stored in
+    array.array objects (or NumPy arrays if use_numpy is set) and
+    string columns are dictionary encoded.
+    '''
+    with open(filename) as f:
+        rows = csv.reader(f)
+        headers = next(rows)
+        columns = { name: _make_column(func) for name, func in zip(headers, types) }
+        appenders = [ (col.append, func) for col, func in zip(columns.values(), types) ]
+        for row in rows:
+            for (append, func), val in zip(appenders, row):
+                append(func(val))
+
+    if use_numpy and numpy is not None:
+        for name, col in columns.items():
+            if isinstance(col, array.array):
+                columns[name] = numpy.frombuffer(col, dtype=col.typecode)
+            elif isinstance(col, EncodedColumn):
+                col.codes = numpy.frombuffer(col.codes, dtype=col.codes.typecode)
+
     return DataCollection(columns)
 
 if __name__ == '__main__':
@@ -34,3 +105,9 @@ if __name__ == '__main__':
     tracemalloc.start()
     data = read_csv_as_columns('../../Data/ctabus.csv', [intern, intern, intern, int])
     print(tracemalloc.get_traced_memory())
+    del data
+
+    tracemalloc.reset_peak()
+    data = read_csv_as_typed_columns('../../Data/ctabus.csv', [intern, intern, intern, int])
+    print(tracemalloc.get_traced_memory())
+    print('Total rides:', sum(data.column_data[3]))
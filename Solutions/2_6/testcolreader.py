@@ -0,0 +1,44 @@
+# testcolreader.py
+
+import array
+import colreader
+import unittest
+
+PORTFOLIO = '../../Data/portfolio.csv'
+
+class TestColreader(unittest.TestCase):
+    def setUp(self):
+        self.data = colreader.read_csv_as_typed_columns(PORTFOLIO, [str, int, float])
+
+    def test_columns(self):
+        names, shares, prices = self.data.column_data
+        self.assertEqual(self.data.column_names, ['name', 'shares', 'price'])
+        self.assertIsInstance(names, colreader.EncodedColumn)
+        self.assertEqual(shares, array.array('q', [100, 50, 150, 200, 95, 50, 100]))
+        self.assertEqual(prices.typecode, 'd')
+        self.assertEqual(list(names), ['AA', 'IBM', 'CAT', 'MSFT', 'GE', 'MSFT', 'IBM'])
+        self.assertEqual(names.values, ['AA', 'IBM', 'CAT', 'MSFT', 'GE'])
+
+    def test_rows(self):
+        self.assertEqual(len(self.data), 7)
+        self.assertEqual(self.data[0], {'name': 'AA', 'shares': 100, 'price': 32.2})
+        self.assertEqual(self.data[-1]['name'], 'IBM')
+        self.assertEqual(list(self.data), list(colreader.read_csv_as_columns(PORTFOLIO, [str, int, float])))
+
+    def test_slice(self):
+        rows = self.data[1:3]
+        self.assertEqual(rows['name'], ['IBM', 'CAT'])
+        self.assertEqual(list(rows['shares']), [50, 150])
+        self.assertEqual(self.data.column_data[0][::-3], ['IBM', 'MSFT', 'AA'])
+
+    @unittest.skipUnless(colreader.numpy, 'requires NumPy')
+    def test_use_numpy(self):
+        data = colreader.read_csv_as_typed_columns(PORTFOLIO, [str, int, float], use_numpy=True)
+        names, shares, prices = data.column_data
+        self.assertIsInstance(shares, colreader.numpy.ndarray)
+        self.assertEqual(shares.sum(), 745)
+        self.assertEqual(list(names), list(self.data.column_data[0]))
+        self.assertEqual(data[2], self.data[2])
+
+if __name__ == '__main__':
+    unittest.main()
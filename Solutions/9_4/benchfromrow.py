@@ -0,0 +1,22 @@
+# benchfromrow.py
+#
+# Compare the generated from_row() class method against the
+# generic zip()-based version in Structure.
+
+from timeit import timeit
+from structly import Structure
+from stock import Stock
+from ticker import Ticker
+
+generic_from_row = Structure.from_row.__func__
+
+def bench(cls, row, number=200000):
+    generic = timeit(lambda: generic_from_row(cls, row), number=number)
+    generated = timeit(lambda: cls.from_row(row), number=number)
+    print('%-8s generic %8.3fs  generated %8.3fs  speedup %5.2fx' %
+          (cls.__name__, generic, generated, generic / generated))
+
+if __name__ == '__main__':
+    bench(Stock, ['GOOG', '100', '490.1'])
+    bench(Ticker, ['IBM', '103.53', '6/11/2007', '09:39.07', '-0.54',
+                   '102.87', '103.53', '102.77', '541633'])
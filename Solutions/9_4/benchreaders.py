@@ -0,0 +1,166 @@
+# benchreaders.py
+#
+# Benchmark the different ways of reading the CTA bus data (2_1/readrides.py,
+# 2_5/readrides.py, 2_6/colreader.py) against the structly readers.  Synthetic data files of
+# the requested sizes are generated, and each strategy runs in a fresh
+# subprocess so the timings and memory numbers don't interfere.  Results
+# are written as JSON.
+#
+#   python benchreaders.py --rows 1000000 10000000 --output results.json
+
+import argparse
+import importlib.util
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from structly import *
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(HERE, path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+# 2_1 has plain dicts and instances without __slots__.  2_5 adds
+# __slots__ and columns, and redefines read_rides_as_dicts as RideData.
+basicrides = load_module('basicrides', '../2_1/readrides.py')
+readrides = load_module('readrides', '../2_5/readrides.py')
+colreader = load_module('colreader', '../2_6/colreader.py')
+
+class Ride(Structure):
+    route = String()
+    date = String()
+    daytype = String()
+    rides = Integer()
+
+types = [str, str, str, int]
+
+def consume(records):
+    n = 0
+    for n, _ in enumerate(records, start=1):
+        pass
+    return n
+
+def iter_instances(filename):
+    with open(filename) as f:
+        return consume(iter_csv_as_instances(f, Ride))
+
+# Strategy name -> function(filename) returning the loaded data
+strategies = {
+    'readrides.tuples': basicrides.read_rides_as_tuples,
+    'readrides.dicts': basicrides.read_rides_as_dicts,
+    'readrides.instances': basicrides.read_rides_as_instances,
+    'readrides.slotted_instances': readrides.read_rides_as_instances,
+    'readrides.columns': readrides.read_rides_as_columns,
+    'readrides.ridedata': readrides.read_rides_as_dicts,
+    'colreader.columns': lambda filename: colreader.read_csv_as_columns(filename, types),
+    'colreader.typed_columns': lambda filename: colreader.read_csv_as_typed_columns(filename, types),
+    'structly.dicts': lambda filename: read_csv_as_dicts(filename, types),
+    'structly.dicts_mmap': lambda filename: read_csv_as_dicts(filename, types, mmap=True),
+    'structly.instances': lambda filename: read_csv_as_instances(filename, Ride),
+    'structly.instances_mmap': lambda filename: read_csv_as_instances(filename, Ride, mmap=True),
+    'structly.instances_parallel': lambda filename: read_csv_as_instances_parallel(filename, Ride),
+    'structly.columns_parallel': lambda filename: read_csv_as_columns_parallel(filename, types),
+    'structly.iter_instances': iter_instances,
+}
+
+# Strategies that parse in worker processes.  tracemalloc only sees the
+# parent, so they get the peak RSS of the workers instead.
+multiprocess = { 'structly.instances_parallel', 'structly.columns_parallel' }
+
+# Strategies that keep no records, so memory per record means nothing
+streaming = { 'structly.iter_instances' }
+
+def make_data(filename, nrows, seed=0):
+    '''
+    Write nrows of synthetic CTA bus data
+    '''
+    rand = random.Random(seed)
+    routes = [ str(n) for n in range(1, 200) ]
+    with open(filename, 'w') as f:
+        f.write('route,date,daytype,rides\n')
+        for n in range(nrows):
+            date = '%02d/%02d/%04d' % (n % 12 + 1, n % 28 + 1, 2001 + n % 20)
+            f.write('%s,%s,%s,%d\n' % (rand.choice(routes), date, 'UAW'[n % 3], rand.randrange(20000)))
+
+# ru_maxrss is in kilobytes on Linux and in bytes on macOS
+_maxrss_scale = 1 if sys.platform == 'darwin' else 1024
+
+def maxrss_bytes(who):
+    return resource.getrusage(who).ru_maxrss * _maxrss_scale
+
+def run_one(name, filename, nrows, memory):
+    '''
+    Run a single strategy in this process and return its measurements
+    '''
+    func = strategies[name]
+    result = { 'name': name, 'rows': nrows }
+    if memory:
+        tracemalloc.start()
+        data = func(filename)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result.update(current_bytes=current, peak_bytes=peak)
+        if name not in streaming:
+            result['bytes_per_record'] = current / nrows if nrows else 0
+    else:
+        start = time.perf_counter()
+        data = func(filename)
+        result['seconds'] = time.perf_counter() - start
+        result['maxrss_bytes'] = maxrss_bytes(resource.RUSAGE_SELF)
+        if name in multiprocess:
+            result['children_maxrss_bytes'] = maxrss_bytes(resource.RUSAGE_CHILDREN)
+    return result
+
+def run_isolated(name, filename, nrows, memory):
+    args = [ sys.executable, __file__, '--run', name, filename, str(nrows) ]
+    if memory:
+        args.append('--memory')
+    out = subprocess.run(args, check=True, capture_output=True, text=True, cwd=HERE).stdout
+    return json.loads(out)
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Benchmark CSV reading strategies')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000000])
+    parser.add_argument('--strategies', nargs='+', default=list(strategies), choices=list(strategies))
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc pass')
+    parser.add_argument('--output', help='write JSON results to this file')
+    parser.add_argument('--run', nargs=3, metavar=('NAME', 'FILE', 'ROWS'), help=argparse.SUPPRESS)
+    parser.add_argument('--memory', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run:
+        name, filename, nrows = args.run
+        print(json.dumps(run_one(name, filename, int(nrows), args.memory)))
+        return
+
+    results = [ ]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for nrows in args.rows:
+            filename = os.path.join(tmpdir, f'rides{nrows}.csv')
+            make_data(filename, nrows)
+            for name in args.strategies:
+                result = run_isolated(name, filename, nrows, memory=False)
+                if not args.no_memory and name not in multiprocess:
+                    result.update(run_isolated(name, filename, nrows, memory=True))
+                print('%-30s %10d rows %8.3fs' % (name, nrows, result['seconds']), file=sys.stderr)
+                results.append(result)
+
+    report = { 'python': sys.version, 'platform': sys.platform, 'results': results }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,36 @@
+# benchvalidated.py
+#
+# Measure the per-call overhead of the @validated and @enforce wrappers
+# against the undecorated function and a wrapper binding every call
+# with sig.bind() (the fallback for *args and **kwargs).
+
+from timeit import timeit
+from structly.validate import Integer, PositiveInteger, enforce, _make_wrapper
+
+def add(x, y):
+    return x + y
+
+def sell(self, nshares):
+    return nshares
+
+def bind_wrapped(func, annotations, retcheck=None):
+    return _make_wrapper(func, annotations, retcheck, '  ', bind=True)
+
+cases = [
+    ('add', add, (2, 3), { 'x': Integer, 'y': Integer }, Integer),
+    ('sell', sell, (None, 100), { 'nshares': PositiveInteger }, None),
+]
+
+def bench(number=500000):
+    for name, func, args, annotations, retcheck in cases:
+        plain = timeit(lambda: func(*args), number=number)
+        bound = bind_wrapped(func, annotations, retcheck)
+        bind = timeit(lambda: bound(*args), number=number)
+        enforced = enforce(**annotations, return_=retcheck)(func)
+        generated = timeit(lambda: enforced(*args), number=number)
+        print('%-6s plain %6.0fns  bind %6.0fns (+%5.0f)  generated %6.0fns (+%5.0f)' %
+              (name, *(t / number * 1e9 for t in (plain, bind, bind - plain,
+                                                   generated, generated - plain))))
+
+if __name__ == '__main__':
+    bench()
@@ -2,8 +2,10 @@
 
 from .structure import *
 from .reader import *
+from .structarray import *
 from .tableformat import *
 
 __all__ = [ *structure.__all__,
             *reader.__all__,
+            *structarray.__all__,
             *tableformat.__all__ ]
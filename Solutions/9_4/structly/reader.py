@@ -1,43 +1,698 @@
 # reader.py
 
+__all__ = [ 'read_csv_as_dicts',
+            'read_csv_as_instances',
+            'iter_convert_csv',
+            'iter_csv_as_dicts',
+            'iter_csv_as_instances',
+            'read_csv_as_dicts_parallel',
+            'read_csv_as_instances_parallel',
+            'read_csv_as_columns_parallel',
+            'open_csv' ]
+
 import csv
+import hashlib
+import importlib
+import io
+import json
 import logging
+import marshal
+import mmap as _mmap
+import os
+import queue
+import threading
+from array import array
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from types import ModuleType
 
 log = logging.getLogger(__name__)
 
+def iter_convert_rows(rows, converter, headers):
+    '''
+    Lazily convert rows that have already been split into fields
+    '''
+    for rowno, row in enumerate(rows, start=1):
+        try:
+            record = converter(headers, row)
+            if record is not SKIP:
+                yield record
+        except ValueError as e:
+            log.warning('Row %s: Bad row: %s', rowno, row)
+            log.debug('Row %s: Reason: %s', rowno, e)
+
+def iter_convert_csv(lines, converter, *, headers=None):
+    '''
+    Lazily convert CSV lines into records, one at a time
+    '''
+    rows = csv.reader(lines)
+    if headers is None:
+        headers = next(rows, None)
+        if headers is None:
+            return
+    yield from iter_convert_rows(rows, converter, headers)
+
 def convert_csv(lines, converter, *, headers=None):
+    return list(iter_convert_csv(lines, converter, headers=headers))
+
+# Converter factories.  Each is called as factory(spec, headers, **options)
+# once the headers are known and returns a converter(headers, row).  They
+# are module-level so that they can be sent to worker processes by the
+# parallel readers below.  A converter returns SKIP for rows rejected by
+# a where= filter.
+
+SKIP = object()
+
+# Operators allowed in where= filters
+_operators = { '<', '<=', '>', '>=', '==', '!=' }
+
+def compile_where(where, headers, types):
+    '''
+    Make a function that tests a raw row against a list of
+    (column, op, value) conditions.  Only the tested columns are
+    converted, using the type for that column position, or the type
+    for that name if types is a mapping of field names to types.
+    '''
+    env = { }
+    tests = [ ]
+    for n, (name, op, value) in enumerate(where):
+        if op not in _operators:
+            raise ValueError(f'Unsupported operator {op!r}')
+        index = _column_indices(headers, [name])[0]
+        if isinstance(types, Mapping):
+            if name not in types:
+                raise KeyError(f'No field {name!r} to filter on')
+            env[f'_t{n}'] = types[name]
+        elif index < len(types):
+            env[f'_t{n}'] = types[index]
+        else:
+            raise KeyError(f'No type for column {name!r}')
+        env[f'_v{n}'] = value
+        tests.append(f'_t{n}(row[{index}]) {op} _v{n}')
+    code = 'def predicate(row):\n'
+    code += f'    return {" and ".join(tests) or "True"}\n'
+    exec(code, env)
+    return env['predicate']
+
+def _filtered(converter, where, headers, types):
+    if not where:
+        return converter
+    predicate = compile_where(where, headers, types)
+    return lambda headers, row: converter(headers, row) if predicate(row) else SKIP
+
+def _column_indices(headers, columns):
+    try:
+        return [ headers.index(name) for name in columns ]
+    except ValueError:
+        missing = [ name for name in columns if name not in headers ]
+        raise KeyError(f'Unknown columns {missing}') from None
+
+def _dict_converter(types, headers, *, columns=None, where=None):
+    if columns is None:
+        converter = lambda headers, row: { name: func(val) for name, func, val in zip(headers, types, row) }
+    else:
+        selected = [ (name, types[index], index)
+                     for name, index in zip(columns, _column_indices(headers, columns)) ]
+        converter = lambda headers, row: { name: func(row[index]) for name, func, index in selected }
+    return _filtered(converter, where, headers, types)
+
+def _instance_converter(cls, headers, *, columns=None, where=None, decode=False):
+    rowtypes = _bytes_types(cls._types) if decode else cls._types
+    fields = cls._fields
+    indices = None
+    if columns is not None:
+        indices = _column_indices(headers, columns)
+        cls = cls.project(columns)
+    if indices is None and not decode:
+        from_row = cls.from_row
+    else:
+        from_row = cls.make_converter(indices, _bytes_types(cls._types) if decode else None)
+    return _filtered(lambda headers, row: from_row(row), where, headers, dict(zip(fields, rowtypes)))
+
+def _projected_values_converter(cls, headers, *, columns, where=None):
+    converter = _instance_converter(cls, headers, columns=columns, where=where)
+    def values(headers, row):
+        record = converter(headers, row)
+        return SKIP if record is SKIP else tuple(record)
+    return values
+
+def _tuple_converter(types, headers, *, columns=None, where=None):
+    if columns is None:
+        converter = lambda headers, row: tuple([ func(val) for func, val in zip(types, row) ])
+    else:
+        selected = [ (types[index], index) for index in _column_indices(headers, columns) ]
+        converter = lambda headers, row: tuple([ func(row[index]) for func, index in selected ])
+    return _filtered(converter, where, headers, types)
+
+def iter_csv_as_dicts(lines, types, *, headers=None, columns=None, where=None):
     rows = csv.reader(lines)
     if headers is None:
-        headers = next(rows)
+        headers = next(rows, None)
+        if headers is None:
+            return
+    converter = _dict_converter(types, headers, columns=columns, where=where)
+    yield from iter_convert_rows(rows, converter, headers)
+
+def iter_csv_as_instances(lines, cls, *, headers=None, columns=None, where=None):
+    rows = csv.reader(lines)
+    if headers is None:
+        headers = next(rows, None)
+        if headers is None:
+            return
+    converter = _instance_converter(cls, headers, columns=columns, where=where)
+    yield from iter_convert_rows(rows, converter, headers)
+
+def csv_as_dicts(lines, types, *, headers=None, columns=None, where=None):
+    return list(iter_csv_as_dicts(lines, types, headers=headers, columns=columns, where=where))
 
+def csv_as_instances(lines, cls, *, headers=None, columns=None, where=None):
+    return list(iter_csv_as_instances(lines, cls, headers=headers, columns=columns, where=where))
+
+def read_csv_as_dicts(filename, types, *, headers=None, columns=None, where=None,
+                      mmap=False, threaded=False, cache=False):
+    '''
+    Read CSV data into a list of dictionaries with optional type conversion.
+    If columns is given, only those columns are converted.  where is a
+    list of (column, op, value) conditions that rows must satisfy.
+    '''
+    typenames = _typenames(filename, types) if cache else None
+    if typenames is not None:
+        schema = ('dicts', typenames, headers, columns, where)
+        return read_cached(filename, schema,
+                           lambda: read_csv_as_dicts(filename, types, headers=headers, columns=columns,
+                                                     where=where, mmap=mmap, threaded=threaded),
+                           lambda records: (list(records[0]) if records else [],
+                                            (rec.values() for rec in records)),
+                           lambda names, rows: [ dict(zip(names, row)) for row in rows ])
+    if mmap and not compression(filename):
+        return read_mmap_csv(filename, _dict_converter, _bytes_types(types),
+                             headers=headers, columns=columns, where=where)
+    with open_csv(filename, threaded=threaded) as file:
+        return csv_as_dicts(file, types, headers=headers, columns=columns, where=where)
+
+def read_csv_as_instances(filename, cls, *, headers=None, columns=None, where=None,
+                          mmap=False, threaded=False, cache=False):
+    '''
+    Read CSV data into a list of instances.  If columns is given, only
+    those fields are converted and the instances are of cls.project(columns).
+    where is a list of (column, op, value) conditions that rows must
+    satisfy.  Rows that fail are dropped before any instance is created.
+    '''
+    typenames = _typenames(filename, [ cls, *cls._types ]) if cache else None
+    if typenames is not None:
+        projection = cls if columns is None else cls.project(columns)
+        schema = ('instances', typenames, cls._fields, headers, columns, where)
+        return read_cached(filename, schema,
+                           lambda: read_csv_as_instances(filename, cls, headers=headers, columns=columns,
+                                                         where=where, mmap=mmap, threaded=threaded),
+                           lambda records: (projection._fields, records),
+                           lambda names, rows: [ projection._make(row) for row in rows ])
+    if mmap and not compression(filename):
+        return read_mmap_csv(filename, _instance_converter, cls,
+                             headers=headers, columns=columns, where=where, decode=True)
+    with open_csv(filename, threaded=threaded) as file:
+        return csv_as_instances(file, cls, headers=headers, columns=columns, where=where)
+
+# -- Parse cache
+#
+# A cache is a sidecar file (filename + '.cache') holding a key followed
+# by the converted data stored column by column.  The key records the
+# file's path, size and modification time along with the schema used
+# to convert it.  If anything changes, the file is parsed again and the
+# cache rewritten.
+#
+# The file only holds data: a JSON line with the key, a JSON line with
+# the field names and column layout, then the raw bytes of the array
+# columns.  Nothing in it is ever executed on load.
+
+_CACHE_VERSION = 2
+
+# Types that survive a round trip through JSON unchanged
+_json_types = { str, int, float, bool, type(None) }
+
+def _typename(obj):
+    '''
+    Name a type or conversion function for a cache key.  Functions also
+    get a digest of their code and closure values, so editing a lambda
+    or a local converter invalidates the cache.  Returns None for other
+    callables (partial objects, bound methods, instances), which can't
+    be named reliably.
+    '''
+    module = getattr(obj, '__module__', None)
+    qualname = getattr(obj, '__qualname__', None)
+    bound = getattr(obj, '__self__', None)
+    if module is None or qualname is None or not (bound is None or isinstance(bound, ModuleType)):
+        return None
+    name = f'{module}.{qualname}'
+    code = getattr(obj, '__code__', None)
+    if code is not None:
+        cells = [ cell.cell_contents for cell in obj.__closure__ or () ]
+        digest = hashlib.sha1(marshal.dumps(code) + repr((obj.__defaults__, cells)).encode())
+        name += ':' + digest.hexdigest()
+    return name
+
+def _typenames(filename, funcs):
+    '''
+    Return the names of types and converters for a cache key, or None
+    if any of them can't be named and the file shouldn't be cached
+    '''
+    names = [ _typename(func) for func in funcs ]
+    if None in names:
+        log.debug('%s: Not caching: a converter has no reliable name', filename)
+        return None
+    return names
+
+def _pack_column(values):
+    '''
+    Store a column compactly.  Columns of all ints or all floats become
+    arrays, anything else is a list.  Returns None if the values can't
+    be stored as JSON.
+    '''
+    for typecode, kind in (('q', int), ('d', float)):
+        if all(type(val) is kind for val in values):
+            try:
+                return array(typecode, values)
+            except OverflowError:
+                break
+    if all(type(val) in _json_types for val in values):
+        return list(values)
+    return None
+
+def read_cached(filename, schema, load, split, make):
+    '''
+    Return records for filename, using the sidecar cache when it is
+    valid.  load() parses the file, split(records) returns the field
+    names and the rows of values to store, and make(names, rows)
+    rebuilds the records from the cache.
+    '''
+    cachename = filename + '.cache'
+    stat = os.stat(filename)
+    key = (_CACHE_VERSION, os.path.abspath(filename), stat.st_size, stat.st_mtime_ns, schema)
+    try:
+        keyline = json.dumps(key).encode() + b'\n'
+    except (TypeError, ValueError) as e:
+        log.debug('%s: Not caching: %s', cachename, e)
+        return load()
+
+    try:
+        with open(cachename, 'rb') as f:
+            if f.readline() == keyline:
+                names, layout = json.loads(f.readline())
+                columns = []
+                for col in layout:
+                    if isinstance(col, list):
+                        columns.append(col)
+                    else:
+                        typecode, n = col.split(':')
+                        columns.append(array(typecode))
+                        columns[-1].fromfile(f, int(n))
+                return make(names, zip(*columns))
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        log.debug('%s: Ignoring unreadable cache: %s', cachename, e)
+
+    records = load()
+    names, rows = split(records)
+    columns = [ _pack_column(col) for col in zip(*rows) ]
+    if any(col is None for col in columns):
+        log.debug('%s: Not caching values that JSON cannot hold', cachename)
+        return records
+    layout = [ f'{col.typecode}:{len(col)}' if isinstance(col, array) else col for col in columns ]
+    try:
+        tmpname = f'{cachename}.{os.getpid()}'
+        with open(tmpname, 'wb') as f:
+            f.write(keyline)
+            f.write(json.dumps([ list(names), layout ]).encode() + b'\n')
+            for col in columns:
+                if isinstance(col, array):
+                    col.tofile(f)
+        os.replace(tmpname, cachename)
+    except OSError as e:
+        log.debug('%s: Unable to write cache: %s', cachename, e)
+    return records
+
+# -- Compressed input
+
+# File signatures and the stdlib module used to read them.  zstd is
+# only available if the running Python has compression.zstd.
+_signatures = [ (b'\x1f\x8b', 'gzip'),
+                (b'BZh', 'bz2'),
+                (b'\xfd7zXZ\x00', 'lzma'),
+                (b'\x28\xb5\x2f\xfd', 'compression.zstd') ]
+
+def _compression(magic):
+    for signature, modname in _signatures:
+        if magic.startswith(signature):
+            return modname
+    return None
+
+def compression(filename):
+    '''
+    Return the name of the module needed to decompress a file or None
+    '''
+    with open(filename, 'rb') as f:
+        return _compression(f.read(6))
+
+def open_csv(filename, *, threaded=False, blocksize=1024*1024):
+    '''
+    Open a file for reading as text, decompressing it on the fly if it
+    is compressed.  The file is opened once and its signature is peeked
+    from the buffer, so pipes and /dev/stdin work too.  If threaded is
+    set, decompression runs in a background thread so it overlaps with
+    parsing.
+    '''
+    file = open(filename, 'rb')
+    modname = _compression(file.peek(6)[:6])
+    if modname is None:
+        return io.TextIOWrapper(file)
+
+    try:
+        module = importlib.import_module(modname)
+    except ImportError:
+        file.close()
+        raise RuntimeError(f'{filename}: {modname} decompression is not available') from None
+
+    raw = DecompressedReader(module.open(file, 'rb'), file)
+    if threaded:
+        raw = ThreadedReader(raw, blocksize)
+    return io.TextIOWrapper(io.BufferedReader(raw, blocksize))
+
+class DecompressedReader(io.RawIOBase):
+    '''
+    Raw binary stream over a decompressing file that also closes the
+    file it reads from.
+    '''
+    def __init__(self, source, file):
+        self._source = source
+        self._file = file
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self._source.readinto(buffer)
+
+    def close(self):
+        if not self.closed:
+            self._source.close()
+            self._file.close()
+        super().close()
+
+class ThreadedReader(io.RawIOBase):
+    '''
+    Raw binary stream that reads blocks from another file in a
+    background thread.
+    '''
+    def __init__(self, source, blocksize, depth=4):
+        self._source = source
+        self._queue = queue.Queue(depth)
+        self._block = memoryview(b'')
+        self._eof = False
+        self._stop = False
+        self._thread = threading.Thread(target=self._produce, args=(blocksize,), daemon=True)
+        self._thread.start()
+
+    def _produce(self, blocksize):
+        try:
+            while not self._stop:
+                data = self._source.read(blocksize)
+                self._queue.put(data)
+                if not data:
+                    break
+        except Exception as e:
+            self._queue.put(e)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._block:
+            if self._eof:
+                return 0
+            data = self._queue.get()
+            if isinstance(data, Exception):
+                raise data
+            if not data:
+                self._eof = True
+                return 0
+            self._block = memoryview(data)
+        n = min(len(buffer), len(self._block))
+        buffer[:n] = self._block[:n]
+        self._block = self._block[n:]
+        return n
+
+    def close(self):
+        if not self.closed:
+            self._stop = True
+            while self._thread.is_alive():
+                try:
+                    self._queue.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            self._source.close()
+        super().close()
+
+# -- Memory-mapped reading
+#
+# Rows are produced as lists of bytes fields split from the mapped file.
+# int() and float() accept bytes directly, so only the fields that are
+# converted to strings ever get decoded.  This is not zero-copy: each
+# block is copied out of the mapping before it is split, and on the
+# benchmark files it measured slower than the text path.
+
+def _csv_row(data, encoding):
+    return [ field.encode(encoding) for field in next(csv.reader(io.StringIO(data.decode(encoding)))) ]
+
+def iter_mmap_rows(buffer, start=0, end=None, *, encoding='utf-8', blocksize=1024*1024):
+    '''
+    Generate rows of bytes fields from a buffer of CSV data.  The buffer
+    is copied and split into lines a block at a time.  Lines with quoted
+    fields that can't be handled by simple splitting, including fields
+    with newlines in them, are handed to the csv module.
+    '''
+    if end is None:
+        end = len(buffer)
+    pos = start
+    pending = None                    # Lines of a row with an open quote
+    while pos < end:
+        stop = min(pos + blocksize, end)
+        if stop < end:
+            nl = buffer.rfind(b'\n', pos, stop)
+            if nl < 0:
+                nl = buffer.find(b'\n', stop, end)
+            stop = end if nl < 0 else nl + 1
+
+        block = buffer[pos:stop]
+        pos = stop
+        lines = block.split(b'\n')
+        if block.endswith(b'\n'):
+            lines.pop()
+        crlf = b'\r' in block
+        for line in lines:
+            if crlf:
+                line = line.rstrip(b'\r')
+            if pending is not None:
+                pending.append(line)
+                if line.count(b'"') % 2:
+                    yield _csv_row(b'\n'.join(pending), encoding)
+                    pending = None
+                continue
+            if not line:
+                yield []
+                continue
+            row = line.split(b',')
+            if b'"' in line:
+                if line.count(b'"') % 2:
+                    pending = [ line ]
+                    continue
+                row = _unquote(row)
+                if row is None:
+                    row = _csv_row(line, encoding)
+            yield row
+    if pending is not None:
+        yield _csv_row(b'\n'.join(pending), encoding)
+
+def _unquote(fields):
+    '''
+    Strip simple quoting ("AA") from split fields.  Returns None if the
+    quoting is anything more complicated (embedded commas or quotes).
+    '''
+    result = []
+    for field in fields:
+        if field[:1] == b'"':
+            if len(field) < 2 or field[-1:] != b'"' or b'"' in field[1:-1]:
+                return None
+            field = field[1:-1]
+        result.append(field)
+    return result
+
+def _bytes_types(types):
+    return [ func if func in (int, float) else
+             bytes.decode if func is str else
+             (lambda val, func=func: func(val.decode()))
+             for func in types ]
+
+def read_mmap_csv(filename, factory, spec, *, headers=None, **options):
+    '''
+    Convert a CSV file using a read-only memory mapping of the file.
+    factory(spec, headers, **options) makes a converter for rows of bytes.
+    '''
+    with open(filename, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return []
+        with _mmap.mmap(f.fileno(), 0, access=_mmap.ACCESS_READ) as buffer:
+            rows = iter_mmap_rows(buffer)
+            if headers is None:
+                headers = [ name.decode() for name in next(rows, []) ]
+            converter = factory(spec, headers, **options)
+
+            records = []
+            for rowno, row in enumerate(rows, start=1):
+                try:
+                    record = converter(headers, row)
+                    if record is not SKIP:
+                        records.append(record)
+                except ValueError as e:
+                    log.warning('Row %s: Bad row: %s', rowno, [ val.decode() for val in row ])
+                    log.debug('Row %s: Reason: %s', rowno, e)
+            return records
+
+# -- Parallel reading
+
+def _split_file(filename, start, chunksize):
+    '''
+    Split a file into (start, end) byte ranges of roughly chunksize bytes.
+    Every range begins at the start of a line.
+    '''
+    size = os.path.getsize(filename)
+    bounds = [ start ]
+    with open(filename, 'rb') as f:
+        pos = start + chunksize
+        while pos < size:
+            f.seek(pos - 1)
+            f.readline()               # Advance to the start of the next line
+            pos = f.tell()
+            if pos >= size:
+                break
+            bounds.append(pos)
+            pos += chunksize
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+def _parse_chunk(filename, start, end, headers, factory, spec, options):
+    '''
+    Convert the rows in one byte range of a file.  Returns the records,
+    the bad rows (numbered relative to the chunk), the number of rows seen
+    and the number of quote characters in the range.
+    '''
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    converter = factory(spec, headers, **options)
     records = []
-    for rowno, row in enumerate(rows, start=1):
+    bad = []
+    nrows = 0
+    for nrows, row in enumerate(csv.reader(io.TextIOWrapper(io.BytesIO(data))), start=1):
         try:
-            records.append(converter(headers, row))
+            record = converter(headers, row)
+            if record is not SKIP:
+                records.append(record)
         except ValueError as e:
-            log.warning('Row %s: Bad row: %s', rowno, row)
-            log.debug('Row %s: Reason: %s', rowno, row)
-    return records
+            bad.append((nrows, row, str(e)))
+    return records, bad, nrows, data.count(b'"')
+
+def _serial_convert(filename, factory, spec, headers, options):
+    with open_csv(filename) as file:
+        rows = csv.reader(file)
+        if headers is None:
+            headers = next(rows, None)
+            if headers is None:
+                return []
+        return list(iter_convert_rows(rows, factory(spec, headers, **options), headers))
+
+def parallel_convert_csv(filename, factory, spec, *, headers=None, workers=None,
+                         chunksize=16*1024*1024, **options):
+    '''
+    Convert a CSV file in parallel.  The file is split into newline-aligned
+    byte ranges that are parsed by a pool of processes.  Records are returned
+    in file order.  If a range ends inside a quoted field (a quoted newline
+    fell on a boundary), the whole file is read again serially.
+    Compressed files can't be split and are read serially.
+    '''
+    if compression(filename):
+        return _serial_convert(filename, factory, spec, headers, options)
+
+    start = 0
+    if headers is None:
+        with open(filename, 'rb') as f:
+            headers = next(csv.reader(io.TextIOWrapper(io.BytesIO(f.readline()))), None)
+            start = f.tell()
+        if headers is None:
+            return []
 
-def csv_as_dicts(lines, types, *, headers=None):
-    return convert_csv(lines, 
-                       lambda headers, row: { name: func(val) for name, func, val in zip(headers, types, row) })
+    chunks = _split_file(filename, start, chunksize)
+    args = [ (filename, lo, hi, headers, factory, spec, options) for lo, hi in chunks ]
+    if len(args) == 1:
+        return _merge_chunks([ _parse_chunk(*args[0]) ])
 
-def csv_as_instances(lines, cls, *, headers=None):
-    return convert_csv(lines,
-                       lambda headers, row: cls.from_row(row))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_parse_chunk, *zip(*args)))
 
-def read_csv_as_dicts(filename, types, *, headers=None):
+    # An odd number of quotes means a range was cut inside a quoted field
+    if any(quotes % 2 for *_, quotes in results):
+        log.info('%s: Quoted newline on a chunk boundary. Reading serially', filename)
+        return _serial_convert(filename, factory, spec, None if start else headers, options)
+    return _merge_chunks(results)
+
+def _merge_chunks(results):
+    records = []
+    rowoffset = 0
+    for chunk, bad, nrows, _ in results:
+        for rowno, row, reason in bad:
+            log.warning('Row %s: Bad row: %s', rowoffset + rowno, row)
+            log.debug('Row %s: Reason: %s', rowoffset + rowno, reason)
+        records.extend(chunk)
+        rowoffset += nrows
+    return records
+
+def read_csv_as_dicts_parallel(filename, types, *, headers=None, columns=None, where=None,
+                               workers=None, **kwargs):
     '''
-    Read CSV data into a list of dictionaries with optional type conversion
+    Read CSV data into a list of dictionaries using a pool of processes
     '''
-    with open(filename) as file:
-        return csv_as_dicts(file, types, headers=headers)
+    return parallel_convert_csv(filename, _dict_converter, types, headers=headers,
+                                columns=columns, where=where, workers=workers, **kwargs)
 
-def read_csv_as_instances(filename, cls, *, headers=None):
+def read_csv_as_instances_parallel(filename, cls, *, headers=None, columns=None, where=None,
+                                   workers=None, **kwargs):
     '''
-    Read CSV data into a list of instances
+    Read CSV data into a list of instances using a pool of processes.
+    cls must be importable by the worker processes.
     '''
-    with open(filename) as file:
-        return csv_as_instances(file, cls, headers=headers)
+    if columns is None:
+        return parallel_convert_csv(filename, _instance_converter, cls, headers=headers,
+                                    where=where, workers=workers, **kwargs)
 
+    # Projected classes only exist in the process that made them, so the
+    # workers send back validated values instead of instances.
+    rows = parallel_convert_csv(filename, _projected_values_converter, cls, headers=headers,
+                                columns=columns, where=where, workers=workers, **kwargs)
+    projection = cls.project(columns)
+    return [ projection._make(row) for row in rows ]
+
+def read_csv_as_columns_parallel(filename, types, *, headers=None, columns=None, where=None,
+                                 workers=None, **kwargs):
+    '''
+    Read CSV data into a dict of column lists using a pool of processes
+    '''
+    rows = parallel_convert_csv(filename, _tuple_converter, types, headers=headers,
+                                columns=columns, where=where, workers=workers, **kwargs)
+    if columns is None:
+        if headers is None:
+            with open_csv(filename) as f:
+                headers = next(csv.reader(f), [])
+        columns = headers
+    data = zip(*rows) if rows else [()] * len(columns)
+    return { name: list(col) for name, col in zip(columns, data) }
@@ -0,0 +1,213 @@
+# structarray.py
+
+__all__ = [ 'StructureArray' ]
+
+import csv
+from array import array
+from collections.abc import Mapping, Sequence
+
+from .structure import _identity, _row_args
+from .reader import open_csv, iter_convert_rows, _column_indices, _filtered
+
+# Column storage for each type conversion.  Anything else is a list.
+_typecodes = { int: 'q', float: 'd' }
+
+def _make_column(func):
+    typecode = _typecodes.get(func)
+    return array(typecode) if typecode else []
+
+def _as_column(values, func):
+    '''
+    Return values as a column that can be appended to.  Anything other
+    than an array or list (a tuple or NumPy array) is copied into the
+    storage used for func.
+    '''
+    if isinstance(values, (array, list)):
+        return values
+    values = values.tolist() if hasattr(values, 'tolist') else list(values)
+    column = _make_column(func)
+    try:
+        column.extend(values)
+    except (TypeError, OverflowError):
+        return values
+    return column
+
+def _make_checker(cls, indices, types=None):
+    '''
+    Make a function that converts the given positions of a row with
+    cls._types, runs the validator checks and returns a tuple of values
+    '''
+    args, env = _row_args(cls._types if types is None else types, indices)
+    code = 'def convert(row):\n'
+    code += f'    {"".join(name + "," for name in cls._fields)} = {args},\n'
+    for name in cls._fields:
+        for line in cls._validators[name].check_source(name, env):
+            code += f'    {line}\n'
+    code += f'    return ({"".join(name + "," for name in cls._fields)})\n'
+    exec(code, env)
+    return env['convert']
+
+class StructureArray(Sequence):
+    '''
+    Holds records of a Structure class as one typed column per field.
+    Indexing returns a lightweight view of a record and slicing returns
+    an array that shares the columns of the original.
+    '''
+    def __init__(self, cls, records=()):
+        self.cls = cls
+        self.columns = [ _make_column(func) for func in cls._types ]
+        self._rows = None             # range of rows for a slice
+        self._view = _view_class(cls)
+        nfields = len(cls._fields)
+        self._check = _make_checker(cls, range(nfields), [_identity] * nfields)
+        self.extend(records)
+
+    @property
+    def column_names(self):
+        return list(self.cls._fields)
+
+    @property
+    def column_data(self):
+        if self._rows is None:
+            return self.columns
+        rows = self._rows
+        stop = rows.stop if rows.stop >= 0 else None     # range(6, -1, -1) runs down to 0
+        return [ col[rows.start:stop:rows.step] for col in self.columns ]
+
+    def __len__(self):
+        if self._rows is None:
+            return len(self.columns[0]) if self.columns else 0
+        return len(self._rows)
+
+    def __getitem__(self, index):
+        rows = self._rows if self._rows is not None else range(len(self))
+        if isinstance(index, slice):
+            view = object.__new__(type(self))
+            view.__dict__.update(self.__dict__)
+            view._rows = rows[index]
+            return view
+        return self._view(self.columns, rows[index])
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.cls.__name__}, <{len(self)} records>)'
+
+    def _append_values(self, values):
+        n = 0
+        try:
+            for n, (col, value) in enumerate(zip(self.columns, values)):
+                try:
+                    col.append(value)
+                except OverflowError:
+                    # Integer too big for the array.  Switch to a list.
+                    self.columns[n] = col = list(col)
+                    col.append(value)
+        except BaseException:
+            # Undo the values already appended so the columns stay equal length
+            for col in self.columns[:n]:
+                col.pop()
+            raise
+
+    def append(self, record):
+        '''
+        Append a record.  Instances of the Structure class are taken
+        as is.  Any other sequence of values is validated first.
+        '''
+        if self._rows is not None:
+            raise TypeError("Can't append to a slice of a StructureArray")
+        if isinstance(record, self.cls):
+            values = tuple(record)
+        else:
+            values = tuple(record)
+            if len(values) != len(self.columns):
+                raise TypeError(f'Expected {len(self.columns)} values')
+            values = self._check(values)
+        self._append_values(values)
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    @classmethod
+    def from_rows(cls, structcls, rows):
+        '''
+        Create an array from rows of strings, converting and validating
+        each row with the types and validators of structcls
+        '''
+        self = cls(structcls)
+        convert = _make_checker(structcls, range(len(structcls._fields)))
+        for row in rows:
+            self._append_values(convert(row))
+        return self
+
+    @classmethod
+    def from_columns(cls, structcls, columns):
+        '''
+        Create an array that holds the given columns (a mapping of field
+        names to columns or columns in field order).  Arrays and lists are
+        held as is and anything else is copied.  The columns are validated
+        as a whole with structcls.validate_columns().
+        '''
+        if not isinstance(columns, Mapping):
+            columns = dict(zip(structcls._fields, columns))
+        types = dict(zip(structcls._fields, structcls._types))
+        columns = { name: _as_column(col, types.get(name)) for name, col in columns.items() }
+        columns = structcls.validate_columns(columns)
+        if set(columns) != set(structcls._fields) or len(set(map(len, columns.values()))) > 1:
+            raise ValueError('Expected columns of equal length for all fields')
+        self = cls(structcls)
+        self.columns = [ columns[name] for name in structcls._fields ]
+        return self
+
+    @classmethod
+    def read_csv(cls, structcls, filename, *, headers=None, columns=None, where=None):
+        '''
+        Read a CSV file into an array.  Bad rows are logged and skipped
+        as in the structly readers.  If columns is given, the array holds
+        records of structcls.project(columns).
+        '''
+        with open_csv(filename) as file:
+            rows = csv.reader(file)
+            if headers is None:
+                headers = next(rows, [])
+            if columns is None:
+                projection = structcls
+                indices = range(len(structcls._fields))
+            else:
+                projection = structcls.project(columns)
+                indices = _column_indices(headers, columns)
+            self = cls(projection)
+            check = _make_checker(projection, indices)
+            converter = _filtered(lambda headers, row: check(row), where, headers,
+                                  dict(zip(structcls._fields, structcls._types)))
+            for values in iter_convert_rows(rows, converter, headers):
+                self._append_values(values)
+        return self
+
+# Record view classes, one per Structure class
+_views = { }
+
+def _view_class(cls):
+    view = _views.get(cls)
+    if view is None:
+        methods = { '__slots__': ('_columns', '_index'),
+                    '_fields': cls._fields }
+        code = 'def __init__(self, columns, index):\n'
+        code += '    self._columns = columns\n'
+        code += '    self._index = index\n'
+        code += 'def __iter__(self):\n'
+        code += '    return (col[self._index] for col in self._columns)\n'
+        code += 'def __repr__(self):\n'
+        code += "    return '%s(%s)' % (self._name, ', '.join(map(repr, self)))\n"
+        code += 'def __eq__(self, other):\n'
+        code += '    try:\n'
+        code += '        values = tuple(other)\n'
+        code += '    except TypeError:\n'
+        code += '        return NotImplemented\n'
+        code += '    return tuple(self) == values\n'
+        exec(code, methods)
+        del methods['__builtins__']
+        methods['_name'] = cls.__name__
+        for n, name in enumerate(cls._fields):
+            methods[name] = property(lambda self, n=n: self._columns[n][self._index])
+        view = _views[cls] = type(f'{cls.__name__}View', (), methods)
+    return view
@@ -1,23 +1,71 @@
 # structure.py
 
-__all__ = [ 'Structure' ]
+__all__ = [ 'Structure', 'FrozenStructure', 'trusted', 'set_trusted' ]
 
-from .validate import Validator, validated
+from .validate import Validator, ValidationErrors, Sampled, validated, _constant
+from .validate import register_impls, trusted, set_trusted
 from collections import ChainMap
+from collections.abc import Mapping
+from copy import copy
+from operator import attrgetter, itemgetter
+from types import new_class
 
 class StructureMeta(type):
     @classmethod
-    def __prepare__(meta, clsname, bases):
+    def __prepare__(meta, clsname, bases, **kwargs):
         return ChainMap({}, Validator.validators)
         
     @staticmethod
-    def __new__(meta, name, bases, methods):
+    def __new__(meta, name, bases, methods, *, slots=False, **kwargs):
         methods = methods.maps[0]
-        return super().__new__(meta, name, bases, methods)
+        if slots:
+            make_slots(methods)
+        cls = super().__new__(meta, name, bases, methods, **kwargs)
+        if vars(cls).get('__setattr__') is _slotted_setattr:
+            register_impls(cls, { '__setattr__': _slotted_setattr },
+                                { '__setattr__': _trusted_slotted_setattr },
+                                { '__setattr__': _instrumented_slotted_setattr })
+        return cls
+
+def make_slots(methods):
+    '''
+    Convert a class namespace to store its validated fields in __slots__.
+    The validators are moved out of the class (the slot descriptors take
+    their names) and checked by __setattr__ instead.
+    '''
+    validators = { name: val for name, val in methods.items()
+                   if isinstance(val, Validator) }
+    for name, val in validators.items():
+        del methods[name]
+        val.__set_name__(None, name)
+    methods['__slots__'] = tuple(validators)
+    methods['_slotvalidators'] = validators
+    methods['_slotchecks'] = { name: val._flatcheck for name, val in validators.items() }
+    methods.setdefault('__setattr__', _slotted_setattr)
+
+def _slotted_setattr(self, name, value):
+    check = self._slotchecks.get(name)
+    if check is None:
+        raise AttributeError('No attribute %s' % name)
+    object.__setattr__(self, name, check(value))
+
+def _trusted_slotted_setattr(self, name, value):
+    if name not in self._slotchecks:
+        raise AttributeError('No attribute %s' % name)
+    object.__setattr__(self, name, value)
+
+def _instrumented_slotted_setattr(self, name, value):
+    validator = self._slotvalidators.get(name)
+    if validator is None:
+        raise AttributeError('No attribute %s' % name)
+    object.__setattr__(self, name, validator._timedcheck(value))
 
 class Structure(metaclass=StructureMeta):
+    __slots__ = ()
     _fields = ()
     _types = ()
+    _validators = { }
+    _options = { }
 
     def __setattr__(self, name, value):
         if name.startswith('_') or name in self._fields:
@@ -36,35 +84,247 @@ class Structure(metaclass=StructureMeta):
     def __eq__(self, other):
         return isinstance(other, type(self)) and tuple(self) == tuple(other)
 
+    @classmethod
+    def _make(cls, values):
+        '''
+        Create an instance from already validated values without
+        running any checks (e.g., values loaded from a cache)
+        '''
+        self = object.__new__(cls)
+        try:
+            self.__dict__.update(zip(cls._fields, values))
+        except AttributeError:
+            # Slotted instances store values directly in the slots
+            for name, value in zip(cls._fields, values):
+                object.__setattr__(self, name, value)
+        return self
+
     @classmethod
     def from_row(cls, row):
         rowdata = [ func(val) for func, val in zip(cls._types, row) ]
         return cls(*rowdata)
 
     @classmethod
-    def create_init(cls):
+    def create_from_row(cls):
         '''
-        Create an __init__ method from _fields
+        Create a from_row() class method specialized to _fields and _types
+        '''
+        args, env = _row_args(cls._types, range(len(cls._types)))
+        code = f'def from_row(cls, row):\n'
+        code += f'    return cls({args})\n'
+        exec(code, env)
+        cls.from_row = classmethod(env['from_row'])
+
+    @classmethod
+    def make_converter(cls, indices=None, types=None):
+        '''
+        Make a function that creates an instance from a row.  indices
+        gives the position of each field in the row and types optionally
+        replaces the conversion functions in _types.
+        '''
+        if indices is None:
+            indices = range(len(cls._fields))
+        args, env = _row_args(types or cls._types, indices)
+        env['cls'] = cls
+        exec(f'def from_row(row):\n    return cls({args})\n', env)
+        return env['from_row']
+
+    @classmethod
+    def validate_columns(cls, columns):
+        '''
+        Validate whole columns of field values with check_many().  columns
+        is a mapping of field names to columns or a sequence of columns in
+        field order.  All failures are raised together in ValidationErrors
+        with (name, index) giving the location of each.
+        '''
+        if not isinstance(columns, Mapping):
+            columns = dict(zip(cls._fields, columns))
+        errors = [ ]
+        for name, column in columns.items():
+            validator = cls._validators.get(name)
+            if validator is None:
+                raise AttributeError('No attribute %s' % name)
+            try:
+                validator.check_many(column)
+            except ValidationErrors as e:
+                errors.extend(((name, index), exc) for index, exc in e.errors)
+        if errors:
+            raise ValidationErrors(errors)
+        return columns
+
+    @classmethod
+    def sampled(cls, *, every=None, budget=None):
+        '''
+        Only validate a sample of the instances created from now on.  See
+        validate.Sampled for every and budget.  Returns the Sampled object
+        holding the counters.  With no arguments, full validation is
+        restored.
+        '''
+        impls = cls._impls
+        method = '__new__' if '__new__' in impls[0] else '__init__'
+        checked, unchecked = impls[0][method], impls[1][method]
+        if isinstance(checked, Sampled):
+            checked = checked._checked
+        sampler = None
+        if every is not None or budget is not None:
+            sampler = Sampled(checked, unchecked, every=every, budget=budget)
+        register_impls(cls, { method: sampler or checked }, { })
+        return sampler
+
+    @classmethod
+    def project(cls, fields):
+        '''
+        Return a Structure class with only the given fields.  Methods
+        other than the validators are not carried over.
+        '''
+        fields = tuple(fields)
+        if fields == cls._fields:
+            return cls
+
+        projections = cls.__dict__.get('_projections')
+        if projections is None:
+            projections = cls._projections = { }
+        if fields not in projections:
+            for name in fields:
+                if name not in cls._fields:
+                    raise AttributeError('No attribute %s' % name)
+            validators = { name: copy(cls._validators[name]) for name in fields }
+            root = FrozenStructure if issubclass(cls, FrozenStructure) else Structure
+            projections[fields] = new_class(cls.__name__, (root,),
+                                            { 'slots': '_slotvalidators' in vars(cls),
+                                              **cls._options },
+                                            lambda ns: ns.update(validators))
+        return projections[fields]
+
+    @classmethod
+    def create_init(cls, inline_checks=False):
+        '''
+        Create an __init__ method from _fields.  If inline_checks is set,
+        the validator checks are written directly into __init__ and the
+        values are stored without going through __setattr__.  Versions
+        without checks (trusted mode) and with timed checks (instrumented
+        mode) are registered as well.
         '''
         args = ','.join(cls._fields)
-        code = f'def __init__(self, {args}):\n'
-        for name in cls._fields:
-            code += f'    self.{name} = {name}\n'
+        header = f'def __init__(self, {args}):\n'
+        code = header
+        locs = { }
+        if inline_checks:
+            for name in cls._fields:
+                for line in cls._validators[name].check_source(name, locs):
+                    code += f'    {line}\n'
+            code += _store_source(cls, locs)
+        else:
+            for name in cls._fields:
+                code += f'    self.{name} = {name}\n'
+        exec(code, locs)
+        checked = locs['__init__']
+        exec(header + _store_source(cls, locs), locs)
+        unchecked = locs['__init__']
+        exec(header + _timed_source(cls, locs) + _store_source(cls, locs), locs)
+        register_impls(cls, { '__init__': checked }, { '__init__': unchecked },
+                       { '__init__': locs['__init__'] })
+
+    @classmethod
+    def create_methods(cls, *, order=False, hashable=False):
+        '''
+        Create __repr__, __iter__ and __eq__ methods that access each
+        field directly.  Optionally create __hash__ and the ordering
+        methods along with a sortkey function.  Methods defined in the
+        class itself are left alone.
+        '''
+        values = ', '.join(f'self.{name}' for name in cls._fields)
+        items = ''.join(f'self.{name},' for name in cls._fields)
+        other = ''.join(f'other.{name},' for name in cls._fields)
+        formats = ', '.join(['%r'] * len(cls._fields))
+
+        code = 'def __repr__(self):\n'
+        code += f"    return '%s({formats})' % (type(self).__name__, {values})\n"
+        code += 'def __iter__(self):\n'
+        code += f'    return iter(({items}))\n'
+        code += 'def __eq__(self, other):\n'
+        # Tuple comparison keeps the identity shortcut for each field
+        # (a NaN field still equals itself)
+        code += f'    return isinstance(other, type(self)) and ({items}) == ({other})\n'
+        methods = [ '__repr__', '__iter__', '__eq__' ]
+        if hashable:
+            code += 'def __hash__(self):\n'
+            code += f'    return hash(({items}))\n'
+            methods.append('__hash__')
+        if order:
+            for method, op in [ ('__lt__', '<'), ('__le__', '<='), ('__gt__', '>'), ('__ge__', '>=') ]:
+                code += f'def {method}(self, other):\n'
+                code += '    if not isinstance(other, type(self)):\n'
+                code += '        return NotImplemented\n'
+                code += f'    return ({items}) {op} ({other})\n'
+                methods.append(method)
+            if 'sortkey' not in vars(cls):
+                cls.sortkey = staticmethod(attrgetter(*cls._fields))
+
         locs = { }
         exec(code, locs)
-        cls.__init__ = locs['__init__']
+        for name in methods:
+            if name not in vars(cls):
+                setattr(cls, name, locs[name])
 
     @classmethod
-    def __init_subclass__(cls):
+    def __init_subclass__(cls, *, inline_checks=False, order=False, hashable=False, **kwargs):
+        super().__init_subclass__(**kwargs)
         # Apply the validated decorator to subclasses
-        validate_attributes(cls)
+        validate_attributes(cls, inline_checks=inline_checks, order=order, hashable=hashable)
+
+def _identity(x):
+    return x
 
-def validate_attributes(cls):
+def _row_args(types, indices):
     '''
-    Class decorator that scans a class definition for Validators
-    and builds a _fields variable that captures their definition order.
+    Make the argument source and namespace for code that converts
+    row[index] with each type
     '''
-    validators = []
+    env = { }
+    args = [ ]
+    for n, (func, index) in enumerate(zip(types, indices)):
+        if func is _identity:
+            args.append(f'row[{index}]')
+        else:
+            env[f'_t{n}'] = func
+            args.append(f'_t{n}(row[{index}])')
+    return ', '.join(args), env
+
+def _store_source(cls, env):
+    '''
+    Make source code that stores the local variables named in _fields
+    directly into an instance's storage (its __dict__ or its slots)
+    '''
+    if '_slotvalidators' in vars(cls):
+        code = ''
+        for name in cls._fields:
+            code += f'    {_slot_setter(cls, name, env)}(self, {name})\n'
+        return code
+    items = ', '.join(f'{name!r}: {name}' for name in cls._fields)
+    return f'    self.__dict__.update({{{items}}})\n'
+
+def _timed_source(cls, env):
+    '''
+    Make source code that checks the local variables named in _fields
+    with the instrumented checks of their validators
+    '''
+    code = ''
+    for name in cls._fields:
+        code += f'    {name} = {_constant(env, cls._validators[name]._timedcheck)}({name})\n'
+    return code
+
+def _slot_setter(cls, name, env):
+    setter = f'_set_{name}'
+    env[setter] = vars(cls)[name].__set__
+    return setter
+
+def collect_fields(cls):
+    '''
+    Scan a class definition for Validators and build the _fields,
+    _types and _validators variables that capture their definition order.
+    '''
+    validators = list(vars(cls).get('_slotvalidators', {}).values())
     for name, val in vars(cls).items():
         if isinstance(val, Validator):
             validators.append(val)
@@ -75,19 +335,109 @@ def validate_attributes(cls):
 
     # Collect all of the field names
     cls._fields = tuple([v.name for v in validators])
+    cls._validators = { v.name: v for v in validators }
 
-    # Collect type conversions. The lambda x:x is an identity
-    # function that's used in case no expected_type is found.
-    cls._types = tuple([ getattr(v, 'expected_type', lambda x: x)
+    # Collect type conversions. _identity is used in case no
+    # expected_type is found.
+    cls._types = tuple([ getattr(v, 'expected_type', _identity)
                    for v in validators ])
+    return cls
+
+def validate_attributes(cls, *, inline_checks=False, order=False, hashable=False):
+    '''
+    Class decorator that scans a class definition for Validators
+    and builds a _fields variable that captures their definition order.
+    '''
+    collect_fields(cls)
 
-    # Create the __init__ method
+    # Create the __init__, from_row and other methods
+    cls._options = dict(inline_checks=inline_checks, order=order, hashable=hashable)
     if cls._fields:
-        cls.create_init()
+        cls.create_init(inline_checks)
+        if 'from_row' not in vars(cls):
+            cls.create_from_row()
+        cls.create_methods(order=order, hashable=hashable)
 
     
     return cls
 
 def typed_structure(clsname, **validators):
-    cls = type(clsname, (Structure,), validators)
+    cls = new_class(clsname, (Structure,), exec_body=lambda ns: ns.update(validators))
+    return cls
+
+class FrozenStructureMeta(StructureMeta):
+    @staticmethod
+    def __new__(meta, name, bases, methods, **kwargs):
+        # Instances are plain tuples, never a tuple plus a __dict__
+        methods.maps[0].setdefault('__slots__', ())
+        return super().__new__(meta, name, bases, methods, **kwargs)
+
+class FrozenStructure(tuple, metaclass=FrozenStructureMeta):
+    '''
+    A structure whose values are stored in a tuple.  Values are
+    validated once when an instance is created and can't be changed.
+    '''
+    _fields = ()
+    _types = ()
+    _validators = { }
+    _options = { }
+
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__, ', '.join(map(repr, self)))
+
+    def __getnewargs__(self):
+        return tuple(self)
+
+    @classmethod
+    def _make(cls, values):
+        return tuple.__new__(cls, values)
+
+    # Storage independent class methods shared with Structure
+    from_row = vars(Structure)['from_row']
+    create_from_row = vars(Structure)['create_from_row']
+    make_converter = vars(Structure)['make_converter']
+    validate_columns = vars(Structure)['validate_columns']
+    sampled = vars(Structure)['sampled']
+    project = vars(Structure)['project']
+
+    @classmethod
+    def create_new(cls):
+        '''
+        Create a __new__ method from _fields with the checks inlined,
+        and versions for trusted and instrumented modes
+        '''
+        args = ','.join(cls._fields)
+        header = f'def __new__(cls, {args}):\n'
+        code = header
+        locs = { '_tuple_new': tuple.__new__ }
+        for name in cls._fields:
+            for line in cls._validators[name].check_source(name, locs):
+                code += f'    {line}\n'
+        store = f'    return _tuple_new(cls, ({args},))\n'
+        exec(code + store, locs)
+        checked = locs['__new__']
+        exec(header + store, locs)
+        unchecked = locs['__new__']
+        exec(header + _timed_source(cls, locs) + store, locs)
+        register_impls(cls, { '__new__': checked }, { '__new__': unchecked },
+                       { '__new__': locs['__new__'] })
+
+    @classmethod
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        freeze_attributes(cls)
+
+def freeze_attributes(cls):
+    '''
+    Class decorator that turns the Validators of a FrozenStructure into
+    read-only properties for the tuple positions
+    '''
+    collect_fields(cls)
+    for index, name in enumerate(cls._fields):
+        setattr(cls, name, property(itemgetter(index), doc=f'Alias for field number {index}'))
+
+    if cls._fields:
+        cls.create_new()
+        if 'from_row' not in vars(cls):
+            cls.create_from_row()
     return cls
@@ -0,0 +1,60 @@
+# binary.py
+
+import struct
+import sys
+from ..formatter import TableFormatter
+
+class BinaryTableFormatter(TableFormatter):
+    '''
+    Fixed-width binary records packed with struct (little-endian, no
+    padding).  Column types come from cls._types for a Structure class
+    cls, from types, or else from the values in the first row.  Strings
+    are UTF-8 encoded into strsize bytes, padded with zero bytes.  A
+    string that doesn't fit raises ValueError.  No headings are written;
+    the record layout is given by the struct attribute.
+    '''
+    mergeable = False
+    _codes = { bool: '?', int: 'q', float: 'd' }
+
+    def __init__(self, *, cls=None, types=None, strsize=16, **kwargs):
+        super().__init__(**kwargs)
+        self.cls = cls
+        self.types = types
+        self.strsize = strsize
+        self.struct = None
+
+    def outfile(self):
+        return self.file or sys.stdout.buffer
+
+    def headings(self, headers):
+        if self.cls is not None:
+            types = dict(zip(self.cls._fields, self.cls._types))
+            self.types = [ types[name] for name in headers ]
+        self.compile_row(len(headers))
+        if self.types is not None:
+            self.compile_struct(self.types)
+
+    def compile_struct(self, types):
+        codes = [ ]
+        for ty in types:
+            if ty is str:
+                codes.append(f'{self.strsize}s')
+            elif ty in self._codes:
+                codes.append(self._codes[ty])
+            else:
+                raise TypeError(f'Unsupported column type {ty}')
+        self.struct = struct.Struct('<' + ''.join(codes))
+        self._strings = [ n for n, ty in enumerate(types) if ty is str ]
+
+    def row(self, rowdata):
+        if self._preformats:
+            rowdata = self.preformat(rowdata)
+        if self.struct is None:
+            self.compile_struct([ type(d) for d in rowdata ])
+        if self._strings:
+            rowdata = list(rowdata)
+            for n in self._strings:
+                rowdata[n] = rowdata[n].encode('utf-8')
+                if len(rowdata[n]) > self.strsize:
+                    raise ValueError(f'{rowdata[n]!r} is longer than strsize={self.strsize} bytes')
+        self.write(self.struct.pack(*rowdata))
@@ -3,8 +3,8 @@
 from ..formatter import TableFormatter
 
 class CSVTableFormatter(TableFormatter):
-    def headings(self, headers):
-        print(','.join(headers))
+    cell_separator = ','
 
-    def row(self, rowdata):
-        print(','.join(str(d) for d in rowdata))
+    def headings(self, headers):
+        self.write(','.join(headers) + '\n')
+        self.compile_row(len(headers))
@@ -3,14 +3,11 @@
 from ..formatter import TableFormatter
 
 class HTMLTableFormatter(TableFormatter):
-    def headings(self, headers):
-        print('<tr>', end=' ')
-        for h in headers:
-            print('<th>%s</th>' % h, end=' ')
-        print('</tr>')
+    row_prefix = '<tr> '
+    cell_format = '<td>%s</td>'
+    cell_separator = ' '
+    row_suffix = ' </tr>\n'
 
-    def row(self, rowdata):
-        print('<tr>', end=' ')
-        for d in rowdata:
-            print('<td>%s</td>' % d, end=' ')
-        print('</tr>')
+    def headings(self, headers):
+        self.write('<tr> ' + ''.join('<th>%s</th> ' % h for h in headers) + '</tr>\n')
+        self.compile_row(len(headers))
@@ -0,0 +1,43 @@
+# jsonl.py
+
+from json import dumps
+from json.encoder import encode_basestring_ascii
+from math import isfinite
+from ..formatter import TableFormatter
+
+# Encoders giving the same result as json.dumps() for common types
+_encoders = {
+    str: encode_basestring_ascii,
+    int: int.__repr__,
+    float: lambda value: float.__repr__(value) if isfinite(value) else dumps(value),
+    bool: lambda value: 'true' if value else 'false',
+    type(None): lambda value: 'null',
+}
+
+def encode(value):
+    encoder = _encoders.get(type(value))
+    return encoder(value) if encoder else dumps(value)
+
+class JSONLTableFormatter(TableFormatter):
+    '''
+    JSON Lines output, one object per row.  The keys are rendered into
+    the row template by headings() and each value is encoded as by
+    json.dumps().
+    '''
+    row_prefix = '{'
+    cell_separator = ', '
+    row_suffix = '}\n'
+    mergeable = False
+
+    def headings(self, headers):
+        self._keys = [ dumps(h).replace('%', '%%') for h in headers ]
+        self.compile_row(len(headers))
+
+    def cell_formats(self, ncolumns):
+        cells, preformats = super().cell_formats(ncolumns)
+        return [ f'{key}: {cell}' for key, cell in zip(self._keys, cells) ], preformats
+
+    def row(self, rowdata):
+        if self._preformats:
+            rowdata = self.preformat(rowdata)
+        self.write(self._template % tuple(map(encode, rowdata)))
@@ -3,9 +3,10 @@
 from ..formatter import TableFormatter
 
 class TextTableFormatter(TableFormatter):
+    cell_format = '%10s'
+    cell_separator = ' '
+
     def headings(self, headers):
-        print(' '.join('%10s' % h for h in headers))
-        print(('-'*10 + ' ')*len(headers))
-    
-    def row(self, rowdata):
-        print(' '.join('%10s' % d for d in rowdata))
+        self.write(' '.join('%10s' % h for h in headers) + '\n')
+        self.write(('-'*10 + ' ')*len(headers) + '\n')
+        self.compile_row(len(headers))
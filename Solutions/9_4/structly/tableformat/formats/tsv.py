@@ -3,7 +3,8 @@
 from ..formatter import TableFormatter
 
 class TSVTableFormatter(TableFormatter):
+    cell_separator = '\t'
+
     def headings(self, headers):
-        print('\t'.join(headers))
-    def row(self, rowdata):
-        print('\t'.join(str(d) for d in rowdata))
+        self.write('\t'.join(headers) + '\n')
+        self.compile_row(len(headers))
@@ -1,42 +1,165 @@
 # tableformat.py
+import re
+import sys
 from abc import ABC, abstractmethod
+from collections.abc import Mapping
+from operator import attrgetter
 
 def print_table(records, fields, formatter):
+    '''
+    Print the given fields of records.  records is a sequence of objects,
+    or columns: a mapping of names to columns or an object with
+    column_names and column_data (e.g. DataCollection, StructureArray).
+    Output is buffered by the formatter.  To see rows of a live stream
+    as they arrive, use a formatter made with bufsize=0.
+    '''
     if not isinstance(formatter, TableFormatter):
         raise RuntimeError('Expected a TableFormatter')
 
     formatter.headings(fields)
-    for r in records:
-        rowdata = [getattr(r, fieldname) for fieldname in fields]
-        formatter.row(rowdata)
+    try:
+        for rowdata in iter_rows(records, fields):
+            formatter.row(rowdata)
+    finally:
+        # Rows already formatted are written even if records fails
+        formatter.flush()
+
+def iter_rows(records, fields):
+    '''
+    Return an iterator over tuples of the fields of each record
+    '''
+    if hasattr(records, 'column_names') and hasattr(records, 'column_data'):
+        records = dict(zip(records.column_names, records.column_data))
+    if isinstance(records, Mapping):
+        return zip(*(records[name] for name in fields))
+
+    if not fields:
+        return (() for _ in records)
+    getter = attrgetter(*fields)
+    if len(fields) == 1:
+        return ((value,) for value in map(getter, records))
+    return map(getter, records)
 
 class TableFormatter(ABC):
+    '''
+    Base class for table formatters.  Output is collected with write()
+    and written to file (sys.stdout if None) in chunks of about bufsize
+    characters.  flush() writes whatever is left.  With bufsize=0 every
+    row is written and the file flushed as soon as it is formatted.
+    '''
     _formats = { }
 
+    # Layout of a row: the prefix, the format of each cell joined by the
+    # separator, then the suffix.  compile_row() turns it into a single
+    # format string so rendering a row is one % operation.
+    row_prefix = ''
+    cell_format = '%s'
+    cell_separator = ','
+    row_suffix = '\n'
+
+    # Whether ColumnFormatMixin may merge column formats into cell_format
+    mergeable = True
+
+    def __init__(self, file=None, bufsize=65536):
+        self.file = file
+        self.bufsize = bufsize
+        self._buffer = [ ]
+        self._size = 0
+
+    def write(self, text):
+        self._buffer.append(text)
+        self._size += len(text)
+        if self._size >= self.bufsize:
+            self.flush()
+
+    def outfile(self):
+        return self.file or sys.stdout
+
+    def flush(self):
+        file = self.outfile()
+        if self._buffer:
+            file.write(type(self._buffer[0])().join(self._buffer))
+            self._buffer.clear()
+            self._size = 0
+        file.flush()
+
     @classmethod
     def __init_subclass__(cls):
         name = cls.__module__.split('.')[-1]
         TableFormatter._formats[name] = cls
 
+    def cell_formats(self, ncolumns):
+        '''
+        Return the format of each cell and a list of formats to apply to
+        the values first (None if there is nothing to apply)
+        '''
+        return [ self.cell_format ] * ncolumns, None
+
+    def compile_row(self, ncolumns):
+        '''
+        Build the row template for ncolumns.  Called by headings().
+        '''
+        cells, self._preformats = self.cell_formats(ncolumns)
+        self._template = self.row_prefix + self.cell_separator.join(cells) + self.row_suffix
+
     @abstractmethod
     def headings(self, headers):
         pass
 
-    @abstractmethod
+    def preformat(self, rowdata):
+        return [ fmt % item if fmt else item for fmt, item in zip(self._preformats, rowdata) ]
+
     def row(self, rowdata):
-        pass
+        if self._preformats:
+            rowdata = self.preformat(rowdata)
+        self.write(self._template % tuple(rowdata))
+
+# A cell format with a single %s conversion and an optional width, and a
+# column format that is a single conversion
+_cell_spec = re.compile(r'%(\d*)s')
+_column_spec = re.compile(r'%([-+ #0]*)(\d*)(\.\d+)?([diouxXeEfFgGcrsa])')
+
+def merge_format(cell, fmt):
+    '''
+    Merge a column format into a cell format, so that cell % value gives
+    the same result as cell % (fmt % value).  Returns None if they can't
+    be merged.
+    '''
+    spec = _cell_spec.search(cell)
+    if not spec or '%' in cell[:spec.start()] + cell[spec.end():]:
+        return None
+    if spec.group(1):
+        column = _column_spec.fullmatch(fmt)
+        if not column or column.group(2):
+            return None
+        # Without a width, the 0 and - flags have no effect
+        flags, _, precision, conversion = column.groups()
+        fmt = f'%{flags.replace("0", "").replace("-", "")}{spec.group(1)}{precision or ""}{conversion}'
+    return cell[:spec.start()] + fmt + cell[spec.end():]
 
 class ColumnFormatMixin:
+    '''
+    Format the values of each column with formats.  They are merged into
+    the row template where possible and applied separately otherwise.
+    '''
     formats = []
-    def row(self, rowdata):
-        rowdata = [ (fmt % item) for fmt, item in zip(self.formats, rowdata)]
-        super().row(rowdata)
+    def cell_formats(self, ncolumns):
+        cells, preformats = super().cell_formats(ncolumns)
+        preformats = preformats or [ None ] * ncolumns
+        for n, fmt in enumerate(self.formats[:ncolumns]):
+            merged = merge_format(cells[n], fmt) if self.mergeable and not preformats[n] else None
+            if merged:
+                cells[n] = merged
+            else:
+                preformats[n] = fmt
+        return cells, preformats if any(preformats) else None
 
 class UpperHeadersMixin:
     def headings(self, headers):
         super().headings([h.upper() for h in headers])
 
-def create_formatter(name, column_formats=None, upper_headers=False):
+def create_formatter(name, column_formats=None, upper_headers=False, *, file=None, bufsize=65536,
+                     **options):
     if name not in TableFormatter._formats:
         __import__(f'{__package__}.formats.{name}')
         
@@ -52,7 +175,4 @@ def create_formatter(name, column_formats=None, upper_headers=False):
         class formatter_cls(UpperHeadersMixin, formatter_cls):
             pass
 
-    return formatter_cls()
-
-
-
+    return formatter_cls(file=file, bufsize=bufsize, **options)
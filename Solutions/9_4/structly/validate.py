@@ -1,5 +1,37 @@
 # validate.py
 
+import logging
+import threading
+from array import array
+from types import MethodType
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+log = logging.getLogger(__name__)
+
+class ValidationErrors(Exception):
+    '''
+    Raised by bulk validation with every failure found.  errors is a
+    list of (where, exception) pairs, where is the index of the value.
+    '''
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__('Bad values\n' + '\n'.join(f'  {where}: {e}' for where, e in errors))
+
+class hybridmethod:
+    '''
+    Like classmethod, but called through an instance the method gets
+    the instance instead of its class
+    '''
+    def __init__(self, func):
+        self.__func__ = func
+
+    def __get__(self, instance, cls):
+        return MethodType(self.__func__, cls if instance is None else instance)
+
 class Validator:
     def __init__(self, name=None):
         self.name = name
@@ -11,14 +43,160 @@ class Validator:
     def check(cls, value):
         return value
 
+    @classmethod
+    def _inline_check(cls, value, env):
+        return []
+
+    @hybridmethod
+    def check_source(self, value, env):
+        '''
+        Return lines of source code that check the variable named value,
+        equivalent to value = self.check(value).  Objects used by the code
+        are added to the dict env.  Every class in the MRO that defines
+        check() must also define _inline_check() or self.check is called.
+        A check() that is an instance method is always called.
+        '''
+        cls = self if isinstance(self, type) else type(self)
+        templates = [ vars(klass).get('_inline_check') for klass in cls.__mro__
+                      if 'check' in vars(klass) ]
+        if None in templates or cls._method_check:
+            return [ f'{value} = {_constant(env, self.check)}({value})' ]
+        return [ line for template in templates
+                 for line in template.__func__(cls, value, env) ]
+
+    @classmethod
+    def _column_check(cls, values):
+        return []
+
+    @hybridmethod
+    def check_many(self, values):
+        '''
+        Check a whole sequence of values, raising ValidationErrors with
+        all failures at once.  Every class in the MRO that defines check()
+        may define _column_check() returning the indices that could fail
+        (or None if it can't tell).  Only those values are checked one at
+        a time, so a typed array that passes is checked in bulk.
+        '''
+        cls = self if isinstance(self, type) else type(self)
+        suspects = set()
+        for klass in cls.__mro__:
+            if 'check' in vars(klass):
+                func = vars(klass).get('_column_check')
+                indices = func.__func__(cls, values) if func else None
+                if indices is None:
+                    suspects = range(len(values))
+                    break
+                suspects.update(indices)
+
+        errors = [ ]
+        for index in sorted(suspects):
+            try:
+                self._flatcheck(values[index])
+            except Exception as e:
+                errors.append((index, e))
+        if errors:
+            raise ValidationErrors(errors)
+        return values
+
     def __set__(self, instance, value):
-        instance.__dict__[self.name] = self.check(value)
+        instance.__dict__[self.name] = self._flatcheck(value)
+
+    @classmethod
+    def _compile_check(cls):
+        '''
+        Compile check_source() into a single function stored as
+        _flatcheck, so a check doesn't go through a chain of
+        super().check() calls.  It raises the same exceptions as check().
+        _timedcheck is the same check recording Stats for instrumentation.
+        If any check() is an instance method, both call self.check().
+        '''
+        stats = _validator_stats.setdefault(cls.__name__, Stats())
+        cls._method_check = any(not isinstance(vars(klass)['check'], (classmethod, staticmethod))
+                                for klass in cls.__mro__ if 'check' in vars(klass))
+        if cls._method_check:
+            cls._flatcheck = _instance_check
+            cls._timedcheck = _timed_instance_check
+            return
+        env = { }
+        code = 'def check(value):\n'
+        for line in cls.check_source('value', env):
+            code += f'    {line}\n'
+        code += '    return value\n'
+        exec(code, env)
+        cls._flatcheck = staticmethod(env['check'])
+        cls._timedcheck = staticmethod(_timed(env['check'], stats))
 
     # Collect all derived classes into a dict
     validators = { }
     @classmethod
     def __init_subclass__(cls):
         cls.validators[cls.__name__] = cls
+        cls._compile_check()
+
+def _constant(env, value):
+    '''
+    Add a value to a code generation namespace and return its name
+    '''
+    name = f'_c{len(env)}'
+    env[name] = value
+    return name
+
+# Instrumentation statistics by Validator class name and function name
+_validator_stats = { }
+_function_stats = { }
+
+class Stats:
+    '''
+    Call counts, failures and cumulative time of a check
+    '''
+    __slots__ = ('calls', 'failures', 'seconds')
+
+    def __init__(self):
+        self.calls = self.failures = 0
+        self.seconds = 0.0
+
+    def add(self, seconds, failed=False):
+        self.calls += 1
+        self.failures += failed
+        self.seconds += seconds
+
+    def snapshot(self):
+        return { 'calls': self.calls, 'failures': self.failures, 'seconds': self.seconds }
+
+def _timed(check, stats):
+    def timed(value):
+        start = perf_counter()
+        try:
+            return check(value)
+        except Exception:
+            stats.failures += 1
+            raise
+        finally:
+            stats.calls += 1
+            stats.seconds += perf_counter() - start
+    return timed
+
+def _instance_check(self, value):
+    return self.check(value)
+
+def _timed_instance_check(self, value):
+    return _timed(self.check, _validator_stats[type(self).__name__])(value)
+
+Validator._compile_check()
+
+_array_types = { **dict.fromkeys('bBhHiIlLqQ', int), 'f': float, 'd': float }
+
+def _column_type(values):
+    '''
+    Return the type of every item in a typed column (array or NumPy
+    array), or None for other sequences.  NumPy columns give the NumPy
+    scalar type, so a bulk check agrees with checking each item.
+    '''
+    if isinstance(values, array):
+        return _array_types.get(values.typecode)
+    if numpy is not None and isinstance(values, numpy.ndarray) and values.dtype.kind in 'iuf':
+        return values.dtype.type
+    return None
 
 class Typed(Validator):
     expected_type = object
@@ -28,6 +206,18 @@ class Typed(Validator):
             raise TypeError(f'expected {cls.expected_type}')
         return super().check(value)
 
+    @classmethod
+    def _inline_check(cls, value, env):
+        return [ f'if not isinstance({value}, {_constant(env, cls.expected_type)}):',
+                 f'    raise TypeError({_constant(env, f"expected {cls.expected_type}")})' ]
+
+    @classmethod
+    def _column_check(cls, values):
+        kind = _column_type(values)
+        if kind is not None and issubclass(kind, cls.expected_type):
+            return []
+        return None
+
 _typed_classes = [
     ('Integer', int),
     ('Float', float),
@@ -43,6 +233,21 @@ class Positive(Validator):
             raise ValueError('must be >= 0')
         return super().check(value)
 
+    @classmethod
+    def _inline_check(cls, value, env):
+        return [ f'if {value} < 0:',
+                 f"    raise ValueError('must be >= 0')" ]
+
+    @classmethod
+    def _column_check(cls, values):
+        if _column_type(values) is None:
+            return None
+        if isinstance(values, array):
+            if len(values) and min(values) < 0:
+                return [ n for n, value in enumerate(values) if value < 0 ]
+            return []
+        return numpy.flatnonzero(values < 0).tolist()
+
 class NonEmpty(Validator):
     @classmethod
     def check(cls, value):
@@ -50,6 +255,11 @@ class NonEmpty(Validator):
             raise ValueError('must be non-empty')
         return super().check(value)
 
+    @classmethod
+    def _inline_check(cls, value, env):
+        return [ f'if len({value}) == 0:',
+                 f"    raise ValueError('must be non-empty')" ]
+
 class PositiveInteger(Integer, Positive):
     pass
 
@@ -59,15 +269,100 @@ class PositiveFloat(Float, Positive):
 class NonEmptyString(String, NonEmpty):
     pass
 
-from inspect import signature
+from contextlib import contextmanager
+from inspect import signature, Parameter
 from functools import wraps
+from time import perf_counter
+from weakref import WeakSet
 
 def isvalidator(item):
     return isinstance(item, type) and issubclass(item, Validator)
 
-def validated(func):
+def _make_wrapper(func, annotations, retcheck, indent, bind=False):
+    '''
+    Make a wrapper with the same parameters as func that calls the
+    validators directly, so Python binds the arguments instead of
+    sig.bind().  Functions taking *args or **kwargs (or parameter names
+    that could clash with the generated code) bind every call instead,
+    as does bind=True.  The wrapper is registered with unchecked
+    (trusted mode) and instrumented versions of its code.
+    '''
     sig = signature(func)
+    params = sig.parameters.values()
+    bind = bind or (any(p.kind in (Parameter.VAR_POSITIONAL, Parameter.VAR_KEYWORD) or
+                        p.name.startswith('_') for p in params) or
+                    not set(annotations) <= set(sig.parameters))
+
+    stats = _function_stats.setdefault(f'{func.__module__}.{func.__qualname__}', Stats())
+    env = { '_func': func, '_sig': sig, '_stats': stats, '_perf_counter': perf_counter }
+    if bind:
+        args = callargs = [ '*_args', '**_kwargs' ]
+        values = { name: f'_arguments[{name!r}]' for name in annotations }
+    else:
+        args = { kind: [ ] for kind in (Parameter.POSITIONAL_ONLY,
+                                        Parameter.POSITIONAL_OR_KEYWORD,
+                                        Parameter.KEYWORD_ONLY) }
+        callargs = [ ]
+        for p in params:
+            arg = p.name
+            if p.default is not p.empty:
+                arg += f'={_constant(env, p.default)}'
+            args[p.kind].append(arg)
+            callargs.append(f'{p.name}={p.name}' if p.kind == Parameter.KEYWORD_ONLY else p.name)
+
+        posonly, regular, kwonly = args.values()
+        args = [ *posonly, *(['/'] if posonly else []), *regular, *(['*'] if kwonly else []), *kwonly ]
+        values = { name: name for name in annotations }
+
+    def source(timed):
+        # Checking code.  If timed, the time spent checking (not in func)
+        # and any failure are added to _stats.
+        check = '_timedcheck' if timed else '_flatcheck'
+        fail = '        _stats.add(_elapsed + _perf_counter() - _start, True)\n' if timed else ''
+        code = '    _elapsed = 0.0\n    _start = _perf_counter()\n' if timed else ''
+        if annotations:
+            if bind:
+                code += '    _arguments = _sig.bind(*_args, **_kwargs).arguments\n'
+            code += '    _errors = []\n'
+            for name, validator in annotations.items():
+                code += '    try:\n'
+                code += f'        {_constant(env, getattr(validator, check))}({values[name]})\n'
+                code += '    except Exception as _e:\n'
+                code += f"        _errors.append(f'{indent}{name}: {{_e}}')\n"
+            code += '    if _errors:\n'
+            code += fail
+            code += "        raise TypeError('Bad Arguments\\n' + '\\n'.join(_errors))\n"
+        if timed:
+            code += '    _elapsed = _perf_counter() - _start\n'
+        code += f'    _result = _func({", ".join(callargs)})\n'
+        if retcheck:
+            if timed:
+                code += '    _start = _perf_counter()\n'
+            code += '    try:\n'
+            code += f'        {_constant(env, getattr(retcheck, check))}(_result)\n'
+            code += '    except Exception as _e:\n'
+            code += fail
+            code += "        raise TypeError(f'Bad return: {_e}') from None\n"
+            if timed:
+                code += '    _elapsed += _perf_counter() - _start\n'
+        if timed:
+            code += '    _stats.add(_elapsed)\n'
+        code += '    return _result\n'
+        return code
+
+    # The wrapper gets a fixed name so it can't replace one of the names
+    # above in env (a function called _func would call itself).  wraps()
+    # sets __name__ and the code objects are renamed for tracebacks.
+    header = f'def _wrapper({", ".join(args)}):\n'
+    codes = [ ]
+    for body in (source(False), f'    return _func({", ".join(callargs)})\n', source(True)):
+        exec(header + body, env)
+        codes.append(env['_wrapper'].__code__.replace(co_name=func.__name__))
+    wrapper = wraps(func)(env['_wrapper'])
+    register_impls(wrapper, *codes)
+    return wrapper
 
+def validated(func):
     # Gather the function annotations
     annotations = { name:val for name, val in func.__annotations__.items()
                     if isvalidator(val) }
@@ -75,65 +370,191 @@ def validated(func):
     # Get the return annotation (if any)
     retcheck = annotations.pop('return', None)
 
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        bound = sig.bind(*args, **kwargs)
-        errors = []
-
-        # Enforce argument checks
-        for name, validator in annotations.items():
-            try:
-                validator.check(bound.arguments[name])
-            except Exception as e:
-                errors.append(f'  {name}: {e}')
-
-        if errors:
-            raise TypeError('Bad Arguments\n' + '\n'.join(errors))
-
-        result = func(*args, **kwargs)
-
-        # Enforce return check (if any)
-        if retcheck:
-            try:
-                retcheck.check(result)
-            except Exception as e:
-                raise TypeError(f'Bad return: {e}') from None
-        return result
-
-    return wrapper
+    return _make_wrapper(func, annotations, retcheck, '  ')
 
 def enforce(**annotations):
     retcheck = annotations.pop('return_', None)
 
     def decorate(func):
-        sig = signature(func)
-
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            bound = sig.bind(*args, **kwargs)
-            errors = []
-
-            # Enforce argument checks
-            for name, validator in annotations.items():
-                try:
-                    validator.check(bound.arguments[name])
-                except Exception as e:
-                    errors.append(f'    {name}: {e}')
-
-            if errors:
-                raise TypeError('Bad Arguments\n' + '\n'.join(errors))
-
-            result = func(*args, **kwargs)
-
-            if retcheck:
-                try:
-                    retcheck.check(result)
-                except Exception as e:
-                    raise TypeError(f'Bad return: {e}') from None
-            return result
-        return wrapper
+        return _make_wrapper(func, annotations, retcheck, '    ')
     return decorate
 
+# Trusted and instrumented modes.  Objects with checked, unchecked
+# (trusted) and instrumented implementations are registered here and
+# the implementations are swapped when the mode changes, so no mode
+# tests a flag on each call.
+
+_trusted = False
+_instrumented = False
+_registered = WeakSet()
+
+def register_impls(obj, checked, unchecked, instrumented=None):
+    '''
+    Register the implementations of obj for each mode.  For a class
+    they are dicts of attributes applied over the checked ones, for a
+    function code objects.
+    '''
+    if isinstance(obj, type):
+        old = vars(obj).get('_impls', ({}, {}, {}))
+        checked, unchecked, instrumented = ({ **prev, **(new or {}) } for prev, new in
+                                            zip(old, (checked, unchecked, instrumented)))
+    obj._impls = (checked, unchecked, instrumented)
+    _registered.add(obj)
+    _swap_impl(obj)
+
+def _swap_impl(obj):
+    checked, unchecked, instrumented = obj._impls
+    impl = unchecked if _trusted else instrumented if _instrumented else None
+    if isinstance(obj, type):
+        for name, value in { **checked, **(impl or {}) }.items():
+            setattr(obj, name, value)
+    else:
+        obj.__code__ = impl or checked
+
+def _swap_all():
+    for obj in list(_registered):
+        _swap_impl(obj)
+
+def set_trusted(flag):
+    '''
+    Turn trusted mode on or off for the whole process.  In trusted mode
+    Structure instances are created and validated functions are called
+    without running any validator checks.
+    '''
+    global _trusted
+    _trusted = bool(flag)
+    _swap_all()
+
+@contextmanager
+def trusted():
+    '''
+    Context manager that turns on trusted mode, e.g. to reload data
+    written by the program itself
+    '''
+    previous = _trusted
+    set_trusted(True)
+    try:
+        yield
+    finally:
+        set_trusted(previous)
+
+def _trusted_set(self, instance, value):
+    instance.__dict__[self.name] = value
+
+def _instrumented_set(self, instance, value):
+    instance.__dict__[self.name] = self._timedcheck(value)
+
+register_impls(Validator, { '__set__': Validator.__set__ }, { '__set__': _trusted_set },
+               { '__set__': _instrumented_set })
+
+# Instrumentation
+
+def set_instrumented(flag):
+    '''
+    Turn instrumentation on or off for the whole process.  While on,
+    checks record call counts, failures and time per Validator class
+    and per validated/enforce function (see get_stats()).  Checks that
+    are inlined into generated code are switched to timed calls.
+    '''
+    global _instrumented
+    _instrumented = bool(flag)
+    _swap_all()
+
+def get_stats():
+    '''
+    Return a snapshot of the instrumentation statistics
+    '''
+    return { 'validators': { name: stats.snapshot() for name, stats in _validator_stats.items()
+                             if stats.calls },
+             'functions': { name: stats.snapshot() for name, stats in _function_stats.items()
+                            if stats.calls } }
+
+def reset_stats():
+    for stats in (*_validator_stats.values(), *_function_stats.values()):
+        stats.__init__()
+
+def format_stats():
+    '''
+    Format the statistics as a single line for logging
+    '''
+    return '; '.join(f'{name} calls={s["calls"]} failures={s["failures"]} time={s["seconds"]:.6f}s'
+                     for group in get_stats().values() for name, s in group.items())
+
+def log_stats(interval=60.0):
+    '''
+    Log format_stats() every interval seconds from a daemon thread.
+    Returns a threading.Event that stops the logging when set.
+    '''
+    stop = threading.Event()
+    def run():
+        while not stop.wait(interval):
+            log.info('Validation stats: %s', format_stats())
+    threading.Thread(target=run, daemon=True).start()
+    return stop
+
+# Sampled validation
+
+class Sampled:
+    '''
+    Validate a sample of the calls to a function.  checked is called
+    for 1 in every calls (or while the time spent in it stays within
+    budget, a fraction of the elapsed time) and unchecked for the rest.
+    Once a sampled call fails, every call is checked until reset().
+    Can also be used as a method (e.g. as __init__).
+    '''
+    def __init__(self, checked, unchecked, *, every=None, budget=None):
+        if (every is None) == (budget is None):
+            raise TypeError('Expected one of every or budget')
+        self._checked = checked
+        self._unchecked = unchecked
+        self.every = every
+        self.budget = budget
+        self.reset()
+
+    def reset(self):
+        '''
+        Clear the counters and go back to sampling
+        '''
+        self.checked = self.skipped = self.failures = 0
+        self.escalated = False
+        self._count = 0
+        self._spent = 0.0
+        self._start = perf_counter()
+
+    def _due(self):
+        if self.escalated:
+            return True
+        if self.every:
+            self._count += 1
+            if self._count < self.every:
+                return False
+            self._count = 0
+            return True
+        return self._spent < self.budget * (perf_counter() - self._start)
+
+    def __call__(self, *args, **kwargs):
+        if not self._due():
+            self.skipped += 1
+            return self._unchecked(*args, **kwargs)
+
+        self.checked += 1
+        start = perf_counter()
+        try:
+            return self._checked(*args, **kwargs)
+        except Exception:
+            self.failures += 1
+            self.escalated = True
+            raise
+        finally:
+            self._spent += perf_counter() - start
+
+    def __get__(self, instance, cls):
+        return self if instance is None else MethodType(self, instance)
+
+    def __repr__(self):
+        return (f'Sampled(checked={self.checked}, skipped={self.skipped}, '
+                f'failures={self.failures}, escalated={self.escalated})')
+
 # Examples
 if __name__ == '__main__':
     @validated
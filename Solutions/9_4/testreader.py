@@ -0,0 +1,229 @@
+# testreader.py
+
+import gzip
+import json
+import os
+import shutil
+import stock
+import structly
+import tempfile
+import threading
+import unittest
+from functools import partial
+
+PORTFOLIO = '../../Data/portfolio.csv'
+MISSING = '../../Data/missing.csv'
+
+class TestReader(unittest.TestCase):
+    def test_read_csv_as_dicts(self):
+        port = structly.read_csv_as_dicts(PORTFOLIO, [str, int, float])
+        self.assertEqual(len(port), 7)
+        self.assertEqual(port[0], {'name': 'AA', 'shares': 100, 'price': 32.2})
+
+    def test_read_csv_as_instances(self):
+        port = structly.read_csv_as_instances(PORTFOLIO, stock.Stock)
+        self.assertEqual(len(port), 7)
+        self.assertEqual(port[0], stock.Stock('AA', 100, 32.2))
+
+    def test_iter_csv_as_instances(self):
+        with open(PORTFOLIO) as f:
+            records = structly.iter_csv_as_instances(f, stock.Stock)
+            self.assertEqual(next(records), stock.Stock('AA', 100, 32.2))
+            self.assertEqual(len(list(records)), 6)
+
+    def test_iter_csv_as_dicts_headers(self):
+        lines = ['AA,100,32.20', 'IBM,50,91.10']
+        records = structly.iter_csv_as_dicts(lines, [str, int, float],
+                                             headers=['name', 'shares', 'price'])
+        self.assertEqual(list(records), [{'name': 'AA', 'shares': 100, 'price': 32.2},
+                                         {'name': 'IBM', 'shares': 50, 'price': 91.1}])
+
+    def test_bad_rows(self):
+        lines = ['name,shares,price', 'AA,100,32.20', 'IBM,,91.10', 'CAT,150,83.44']
+        with self.assertLogs('structly.reader', level='WARNING') as cm:
+            records = list(structly.iter_csv_as_instances(lines, stock.Stock))
+        self.assertEqual(len(records), 2)
+        self.assertIn('Row 2: Bad row', cm.output[0])
+
+    def test_read_csv_as_instances_parallel(self):
+        port = structly.read_csv_as_instances_parallel(PORTFOLIO, stock.Stock,
+                                                        workers=2, chunksize=40)
+        self.assertEqual(port, structly.read_csv_as_instances(PORTFOLIO, stock.Stock))
+
+    def test_parallel_bad_rows(self):
+        with self.assertLogs('structly.reader', level='WARNING') as serial:
+            expected = structly.read_csv_as_dicts(MISSING, [str, int, float])
+        with self.assertLogs('structly.reader', level='WARNING') as parallel:
+            port = structly.read_csv_as_dicts_parallel(MISSING, [str, int, float],
+                                                       workers=2, chunksize=30)
+        self.assertEqual(port, expected)
+        self.assertEqual(parallel.output, serial.output)
+
+    def test_parallel_quoted_newlines(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'quoted.csv')
+            with open(filename, 'w') as f:
+                f.write('name,shares,price\n')
+                for n in range(10):
+                    f.write(f'"A\nB{n}",{n},1.5\n')
+            with self.assertLogs('structly.reader', level='INFO'):
+                port = structly.read_csv_as_dicts_parallel(filename, [str, int, float],
+                                                           workers=2, chunksize=15)
+            self.assertEqual(port, structly.read_csv_as_dicts(filename, [str, int, float]))
+            self.assertEqual(port[3], {'name': 'A\nB3', 'shares': 3, 'price': 1.5})
+
+    def test_read_csv_as_columns_parallel(self):
+        cols = structly.read_csv_as_columns_parallel(PORTFOLIO, [str, int, float], chunksize=40)
+        self.assertEqual(cols['shares'], [100, 50, 150, 200, 95, 50, 100])
+
+    def test_mmap(self):
+        self.assertEqual(structly.read_csv_as_instances(PORTFOLIO, stock.Stock, mmap=True),
+                         structly.read_csv_as_instances(PORTFOLIO, stock.Stock))
+        with self.assertLogs('structly.reader', level='WARNING') as serial:
+            expected = structly.read_csv_as_dicts(MISSING, [str, int, float])
+        with self.assertLogs('structly.reader', level='WARNING') as mapped:
+            port = structly.read_csv_as_dicts(MISSING, [str, int, float], mmap=True)
+        self.assertEqual(port, expected)
+        self.assertEqual(mapped.output, serial.output)
+
+    def test_mmap_quoted_newlines(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'quoted.csv')
+            with open(filename, 'w') as f:
+                f.write('name,shares,price\n"A\nB",1,1.5\n"C, ""D""\n\nE",2,2.5\nF,3,3.5\n')
+            port = structly.read_csv_as_dicts(filename, [str, int, float], mmap=True)
+            self.assertEqual(port, structly.read_csv_as_dicts(filename, [str, int, float]))
+            self.assertEqual([ rec['name'] for rec in port ], ['A\nB', 'C, "D"\n\nE', 'F'])
+            port = structly.read_csv_as_instances(filename, stock.Stock, mmap=True)
+            self.assertEqual(port, structly.read_csv_as_instances(filename, stock.Stock))
+        rows = structly.reader.iter_mmap_rows(b'"A\nB",1\nC,2\n', blocksize=3)
+        self.assertEqual(list(rows), [[b'A\nB', b'1'], [b'C', b'2']])
+
+    def test_compressed(self):
+        port = structly.read_csv_as_instances(PORTFOLIO + '.gz', stock.Stock)
+        self.assertEqual(port, structly.read_csv_as_instances(PORTFOLIO, stock.Stock))
+        port = structly.read_csv_as_dicts(PORTFOLIO + '.gz', [str, int, float], threaded=True)
+        self.assertEqual(port, structly.read_csv_as_dicts(PORTFOLIO, [str, int, float]))
+
+    @unittest.skipUnless(hasattr(os, 'mkfifo'), 'requires named pipes')
+    def test_pipe(self):
+        with open(PORTFOLIO, 'rb') as f:
+            data = f.read()
+        expected = structly.read_csv_as_instances(PORTFOLIO, stock.Stock)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fifo = os.path.join(tmpdir, 'fifo')
+            os.mkfifo(fifo)
+            for payload in (data, gzip.compress(data)):
+                def write():
+                    with open(fifo, 'wb') as f:
+                        f.write(payload)
+                writer = threading.Thread(target=write)
+                writer.start()
+                port = structly.read_csv_as_instances(fifo, stock.Stock)
+                writer.join()
+                self.assertEqual(port, expected)
+
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'portfolio.csv')
+            shutil.copy(PORTFOLIO, filename)
+            port = structly.read_csv_as_instances(filename, stock.Stock, cache=True)
+            self.assertTrue(os.path.exists(filename + '.cache'))
+            self.assertEqual(structly.read_csv_as_instances(filename, stock.Stock, cache=True), port)
+
+            # A different schema must not use the cached instances
+            port = structly.read_csv_as_dicts(filename, [str, int, float], cache=True)
+            self.assertEqual(port[0], {'name': 'AA', 'shares': 100, 'price': 32.2})
+
+            # Changing the file invalidates the cache
+            with open(filename, 'a') as f:
+                f.write('"XYZ",10,1.5\n')
+            port = structly.read_csv_as_instances(filename, stock.Stock, cache=True)
+            self.assertEqual(port[-1], stock.Stock('XYZ', 10, 1.5))
+
+    def test_empty(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'empty.csv')
+            open(filename, 'w').close()
+            self.assertEqual(list(structly.iter_csv_as_instances([], stock.Stock)), [])
+            self.assertEqual(list(structly.iter_csv_as_dicts([], [str, int, float])), [])
+            for options in ({ }, { 'mmap': True }):
+                self.assertEqual(structly.read_csv_as_dicts(filename, [str, int, float], **options), [])
+                self.assertEqual(structly.read_csv_as_instances(filename, stock.Stock, **options), [])
+            self.assertEqual(structly.read_csv_as_instances_parallel(filename, stock.Stock), [])
+            self.assertEqual(structly.read_csv_as_columns_parallel(filename, [str, int, float]), {})
+            self.assertEqual(len(structly.StructureArray.read_csv(stock.Stock, filename)), 0)
+
+    def test_cache_converters(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'portfolio.csv')
+            shutil.copy(PORTFOLIO, filename)
+            port = structly.read_csv_as_dicts(filename, [lambda s: s.lower(), int, float], cache=True)
+            self.assertEqual(port[0]['name'], 'aa')
+            with open(filename + '.cache', 'rb') as f:
+                self.assertEqual(json.loads(f.readline())[0], 2)
+
+            # A different lambda must not be served the cached values
+            types = [lambda s: s.title(), int, float]
+            port = structly.read_csv_as_dicts(filename, types, cache=True)
+            self.assertEqual(port[0]['name'], 'Aa')
+            self.assertEqual(structly.read_csv_as_dicts(filename, types, cache=True), port)
+
+            # Converters without a reliable name are read without the cache
+            os.remove(filename + '.cache')
+            for func, shares in ((partial(int, base=10), 100), ('{}'.format, '100')):
+                with self.assertLogs('structly.reader', level='DEBUG'):
+                    port = structly.read_csv_as_dicts(filename, [str, func, float], cache=True)
+                self.assertEqual(port[0]['shares'], shares)
+                self.assertFalse(os.path.exists(filename + '.cache'))
+
+    def test_columns(self):
+        port = structly.read_csv_as_dicts(PORTFOLIO, [str, int, float], columns=['name', 'price'])
+        self.assertEqual(port[0], {'name': 'AA', 'price': 32.2})
+        port = structly.read_csv_as_instances(PORTFOLIO, stock.Stock, columns=['name', 'price'])
+        self.assertEqual(port[0]._fields, ('name', 'price'))
+        self.assertEqual((port[0].name, port[0].price), ('AA', 32.2))
+        self.assertIs(type(port[0]), stock.Stock.project(['name', 'price']))
+
+    def test_columns_unconverted(self):
+        # The bad shares values are never converted
+        port = structly.read_csv_as_dicts(MISSING, [str, int, float], columns=['name'], mmap=True)
+        self.assertEqual(len(port), 28)
+        with self.assertRaises(KeyError):
+            structly.read_csv_as_dicts(PORTFOLIO, [str, int, float], columns=['cost'])
+
+    def test_where(self):
+        port = structly.read_csv_as_instances(PORTFOLIO, stock.Stock,
+                                              where=[('price', '>', 60), ('shares', '<', 100)])
+        self.assertEqual(port, [stock.Stock('IBM', 50, 91.1), stock.Stock('MSFT', 50, 65.1)])
+        port = structly.read_csv_as_dicts(PORTFOLIO, [str, int, float], columns=['name'],
+                                          where=[('name', '==', 'IBM')], mmap=True)
+        self.assertEqual(port, [{'name': 'IBM'}, {'name': 'IBM'}])
+        with self.assertRaises(ValueError):
+            structly.read_csv_as_dicts(PORTFOLIO, [str, int, float], where=[('price', 'in', 1)])
+
+    def test_where_reordered(self):
+        # Fields are found by name when the headers are in another order
+        lines = ['price,name,shares,date', '32.20,AA,100,6/11', '91.10,IBM,50,6/11']
+        port = list(structly.iter_csv_as_instances(lines, stock.Stock, columns=['name', 'price'],
+                                                   where=[('price', '>', 50)]))
+        self.assertEqual([ (s.name, s.price) for s in port ], [('IBM', 91.1)])
+        port = list(structly.iter_csv_as_instances(lines, stock.Stock, columns=['name', 'shares'],
+                                                   where=[('name', '==', 'AA')]))
+        self.assertEqual([ tuple(s) for s in port ], [('AA', 100)])
+        with self.assertRaises(KeyError):
+            list(structly.iter_csv_as_instances(lines, stock.Stock, columns=['name'],
+                                                where=[('date', '==', '6/11')]))
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'reordered.csv')
+            with open(filename, 'w') as f:
+                f.write('\n'.join(lines) + '\n')
+            a = structly.StructureArray.read_csv(stock.Stock, filename, columns=['name', 'price'],
+                                                 where=[('price', '>', 50)])
+            self.assertEqual(list(map(tuple, a)), [('IBM', 91.1)])
+            port = structly.read_csv_as_instances(filename, stock.Stock, columns=['name', 'price'],
+                                                  where=[('price', '>', 50)], mmap=True)
+            self.assertEqual([ s.name for s in port ], ['IBM'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,518 @@
+# teststock.py
+
+import io
+import pickle
+import stock
+import structly
+import unittest
+from contextlib import redirect_stdout
+from array import array
+from structly.validate import String, Integer, PositiveInteger, PositiveFloat, ValidationErrors, validated, enforce
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+class SlottedStock(structly.Structure, slots=True):
+    name = String()
+    shares = PositiveInteger()
+    price = PositiveFloat()
+
+class TestStock(unittest.TestCase):
+    def test_create(self):
+        s = stock.Stock('GOOG', 100, 490.1)
+        self.assertEqual(s.name, 'GOOG')
+        self.assertEqual(s.shares, 100)
+        self.assertEqual(s.price, 490.1)
+
+    def test_create_keyword(self):
+        s = stock.Stock(name='GOOG', shares=100, price=490.1)
+        self.assertEqual(s.name, 'GOOG')
+        self.assertEqual(s.shares, 100)
+        self.assertEqual(s.price, 490.1)
+        
+    def test_cost(self):
+        s = stock.Stock('GOOG', 100, 490.1)
+        self.assertEqual(s.cost, 49010.0)
+
+    def test_sell(self):
+        s = stock.Stock('GOOG', 100, 490.1)
+        s.sell(25)
+        self.assertEqual(s.shares, 75)
+
+    def test_from_row(self):
+        s = stock.Stock.from_row(['GOOG','100','490.1'])
+        self.assertEqual(s.name, 'GOOG')
+        self.assertEqual(s.shares, 100)
+        self.assertEqual(s.price, 490.1)
+
+    def test_from_row_generated(self):
+        self.assertIn('from_row', vars(stock.Stock))
+        s = stock.Stock.from_row(['GOOG','100','490.1','extra'])
+        self.assertEqual(s, stock.Stock('GOOG', 100, 490.1))
+        with self.assertRaises(ValueError):
+            stock.Stock.from_row(['GOOG','x','490.1'])
+
+    def test_repr(self):
+        s = stock.Stock('GOOG', 100, 490.1)
+        self.assertEqual(repr(s), "Stock('GOOG', 100, 490.1)")
+
+    def test_eq(self):
+        a = stock.Stock('GOOG', 100, 490.1)
+        b = stock.Stock('GOOG', 100, 490.1)
+        self.assertTrue(a==b)
+
+    # Tests for failure conditions
+    def test_shares_badtype(self):
+        s = stock.Stock('GOOG', 100, 490.1)
+        with self.assertRaises(TypeError):
+            s.shares = '50'
+
+    def test_shares_badvalue(self):
+        s = stock.Stock('GOOG', 100, 490.1)
+        with self.assertRaises(ValueError):
+            s.shares = -50
+
+    def test_price_badtype(self):
+        s = stock.Stock('GOOG', 100, 490.1)
+        with self.assertRaises(TypeError):
+            s.price = '45.23'
+
+    def test_price_badvalue(self):
+        s = stock.Stock('GOOG', 100, 490.1)
+        with self.assertRaises(ValueError):
+            s.price = -45.23
+
+    def test_bad_attribute(self):
+        s = stock.Stock('GOOG', 100, 490.1)
+        with self.assertRaises(AttributeError):
+            s.share = 100
+
+class TestSlottedStock(unittest.TestCase):
+    def test_create(self):
+        s = SlottedStock('GOOG', 100, 490.1)
+        self.assertEqual(list(s), ['GOOG', 100, 490.1])
+        self.assertEqual(SlottedStock._fields, ('name', 'shares', 'price'))
+        self.assertFalse(hasattr(s, '__dict__'))
+
+    def test_from_row(self):
+        s = SlottedStock.from_row(['GOOG','100','490.1'])
+        self.assertEqual(s, SlottedStock('GOOG', 100, 490.1))
+
+    def test_validation(self):
+        s = SlottedStock('GOOG', 100, 490.1)
+        with self.assertRaises(TypeError):
+            s.shares = '50'
+        with self.assertRaises(ValueError):
+            s.price = -45.23
+        with self.assertRaises(AttributeError):
+            s.share = 100
+
+    def test_pickle(self):
+        s = SlottedStock('GOOG', 100, 490.1)
+        self.assertEqual(pickle.loads(pickle.dumps(s)), s)
+
+class CheckedStock(structly.Structure):
+    name = NonEmptyString()
+    shares = PositiveInteger()
+    price = PositiveFloat()
+
+class InlineStock(structly.Structure, inline_checks=True):
+    name = NonEmptyString()
+    shares = PositiveInteger()
+    price = PositiveFloat()
+
+class TestInlineChecks(unittest.TestCase):
+    def test_create(self):
+        s = InlineStock('GOOG', 100, 490.1)
+        self.assertEqual(list(s), ['GOOG', 100, 490.1])
+        s.shares = 50
+        self.assertEqual(s.shares, 50)
+
+    def test_errors(self):
+        # Error messages must match the validators' own check()
+        for args in [('', 100, 490.1), ('GOOG', -1, 490.1), ('GOOG', 100, '490.1')]:
+            with self.assertRaises(Exception) as inline:
+                InlineStock(*args)
+            with self.assertRaises(Exception) as normal:
+                CheckedStock(*args)
+            self.assertEqual(type(inline.exception), type(normal.exception))
+            self.assertEqual(str(inline.exception), str(normal.exception))
+
+    def test_custom_validator(self):
+        class Upper(String):
+            @classmethod
+            def check(cls, value):
+                return super().check(value).upper()
+        class Item(structly.Structure, inline_checks=True, slots=True):
+            name = Upper()
+        self.assertEqual(Item('goog').name, 'GOOG')
+        with self.assertRaises(TypeError):
+            Item(42)
+
+class OrderedStock(structly.Structure, order=True, hashable=True):
+    name = String()
+    shares = PositiveInteger()
+
+class TestGeneratedMethods(unittest.TestCase):
+    def test_eq(self):
+        self.assertNotEqual(stock.Stock('GOOG', 100, 490.1), stock.Stock('GOOG', 100, 490.2))
+        self.assertNotEqual(stock.Stock('GOOG', 100, 490.1), ('GOOG', 100, 490.1))
+        s = stock.Stock('GOOG', 100, float('nan'))
+        self.assertEqual(s, s)
+
+    def test_unhashable(self):
+        with self.assertRaises(TypeError):
+            hash(stock.Stock('GOOG', 100, 490.1))
+
+    def test_hash(self):
+        recs = [ OrderedStock('GOOG', 100), OrderedStock('IBM', 50), OrderedStock('GOOG', 100) ]
+        self.assertEqual(len(set(recs)), 2)
+
+    def test_order(self):
+        a = OrderedStock('GOOG', 100)
+        b = OrderedStock('GOOG', 150)
+        self.assertTrue(a < b and b > a and a <= a and b >= a)
+        self.assertEqual(sorted([b, a]), [a, b])
+        self.assertEqual(sorted([b, a], key=OrderedStock.sortkey), [a, b])
+
+class FrozenStock(structly.FrozenStructure):
+    name = String()
+    shares = PositiveInteger()
+    price = PositiveFloat()
+
+    @property
+    def cost(self):
+        return self.shares * self.price
+
+class TestFrozenStock(unittest.TestCase):
+    def test_create(self):
+        s = FrozenStock('GOOG', 100, 490.1)
+        self.assertEqual((s.name, s.shares, s.price), ('GOOG', 100, 490.1))
+        self.assertEqual(s.cost, 49010.0)
+        self.assertEqual(repr(s), "FrozenStock('GOOG', 100, 490.1)")
+        self.assertEqual(FrozenStock.from_row(['GOOG','100','490.1']), s)
+
+    def test_immutable(self):
+        s = FrozenStock('GOOG', 100, 490.1)
+        with self.assertRaises(AttributeError):
+            s.shares = 50
+
+    def test_validation(self):
+        with self.assertRaises(TypeError):
+            FrozenStock('GOOG', '100', 490.1)
+        with self.assertRaises(ValueError):
+            FrozenStock('GOOG', 100, -490.1)
+
+    def test_hash_pickle(self):
+        s = FrozenStock('GOOG', 100, 490.1)
+        self.assertEqual(len({s, FrozenStock('GOOG', 100, 490.1)}), 1)
+        self.assertEqual(pickle.loads(pickle.dumps(s)), s)
+
+class TestStructureArray(unittest.TestCase):
+    def test_append_index(self):
+        a = structly.StructureArray(stock.Stock)
+        a.append(stock.Stock('GOOG', 100, 490.1))
+        a.extend([('IBM', 50, 91.1), ('AA', 10, 32.2)])
+        self.assertEqual(len(a), 3)
+        self.assertEqual(a[1].name, 'IBM')
+        self.assertEqual(a[-1].shares, 10)
+        self.assertEqual(tuple(a[0]), ('GOOG', 100, 490.1))
+        self.assertEqual(a[0], stock.Stock('GOOG', 100, 490.1))
+        self.assertEqual(repr(a[0]), "Stock('GOOG', 100, 490.1)")
+        self.assertNotEqual(a[0], 5)
+        self.assertFalse(a[0] == None)
+        self.assertEqual(a.columns[1].typecode, 'q')
+        with self.assertRaises(IndexError):
+            a[3]
+
+    def test_validation(self):
+        a = structly.StructureArray(stock.Stock)
+        with self.assertRaises(TypeError):
+            a.append(('GOOG', '100', 490.1))
+        with self.assertRaises(ValueError):
+            a.append(('GOOG', 100, -490.1))
+        with self.assertRaises(TypeError):
+            a.append(('GOOG', 100))
+        self.assertEqual(len(a), 0)
+
+    def test_failed_append(self):
+        a = structly.StructureArray(stock.Stock, [('IBM', 50, 91.1)])
+        with structly.trusted():
+            s = stock.Stock('GOOG', '100', 490.1)
+        with self.assertRaises(TypeError):
+            a.append(s)
+        self.assertEqual(list(map(len, a.columns)), [1, 1, 1])
+        self.assertEqual(list(a), [('IBM', 50, 91.1)])
+
+    def test_slice(self):
+        a = structly.StructureArray.read_csv(stock.Stock, '../../Data/portfolio.csv')
+        b = a[1::2]
+        self.assertEqual([s.name for s in b], ['IBM', 'MSFT', 'MSFT'])
+        self.assertIs(b.columns, a.columns)
+        self.assertEqual(b[1:][0].name, 'MSFT')
+        self.assertEqual(b.column_data[0], ['IBM', 'MSFT', 'MSFT'])
+        r = a[::-1]
+        self.assertEqual(r.column_data[0], [s.name for s in reversed(a)])
+        self.assertEqual(list(r.column_data[1]), [100, 50, 95, 200, 150, 50, 100])
+        self.assertEqual(a[-2::-2].column_data[0], ['MSFT', 'MSFT', 'IBM'])
+        with redirect_stdout(io.StringIO()) as f:
+            structly.print_table(r, ['name'], structly.create_formatter('csv'))
+        self.assertEqual(f.getvalue().split(), ['name'] + r.column_data[0])
+        with self.assertRaises(TypeError):
+            b.append(('GOOG', 100, 490.1))
+
+    def test_read(self):
+        a = structly.StructureArray.read_csv(stock.Stock, '../../Data/portfolio.csv')
+        port = structly.read_csv_as_instances('../../Data/portfolio.csv', stock.Stock)
+        self.assertEqual(list(a), port)
+        b = structly.StructureArray.from_rows(stock.Stock, [['AA', '100', '32.20']])
+        self.assertEqual(b[0], stock.Stock('AA', 100, 32.2))
+        with self.assertLogs('structly.reader'):
+            c = structly.StructureArray.read_csv(stock.Stock, '../../Data/missing.csv')
+        self.assertEqual(len(c), 20)
+        d = structly.StructureArray.read_csv(stock.Stock, '../../Data/portfolio.csv',
+                                             columns=['name', 'shares'],
+                                             where=[('shares', '>', 100)])
+        self.assertEqual(d.column_names, ['name', 'shares'])
+        self.assertEqual(list(map(tuple, d)), [('CAT', 150), ('MSFT', 200)])
+
+    def test_print_table(self):
+        a = structly.StructureArray.read_csv(stock.Stock, '../../Data/portfolio.csv')
+        port = structly.read_csv_as_instances('../../Data/portfolio.csv', stock.Stock)
+        out = [ ]
+        for records in (a, port):
+            with redirect_stdout(io.StringIO()) as f:
+                structly.print_table(records, ['name', 'shares'], structly.create_formatter('csv'))
+            out.append(f.getvalue())
+        self.assertEqual(out[0], out[1])
+
+class TestBatchValidation(unittest.TestCase):
+    def test_check_many(self):
+        values = array('q', [1, -2, 3, -4])
+        with self.assertRaises(ValidationErrors) as cm:
+            PositiveInteger.check_many(values)
+        self.assertEqual([ index for index, e in cm.exception.errors ], [1, 3])
+        self.assertIsInstance(cm.exception.errors[0][1], ValueError)
+        good = array('q', [1, 2])
+        self.assertIs(PositiveInteger.check_many(good), good)
+        self.assertEqual(len(PositiveInteger.check_many(good[:0])), 0)
+
+    def test_check_many_untyped(self):
+        with self.assertRaises(ValidationErrors) as cm:
+            PositiveFloat.check_many([1.5, 2, -3.0])
+        errors = cm.exception.errors
+        self.assertEqual([ index for index, e in errors ], [1, 2])
+        self.assertIsInstance(errors[0][1], TypeError)
+        with self.assertRaises(ValidationErrors):
+            PositiveFloat.check_many(array('q', [1]))
+
+    def test_validate_columns(self):
+        columns = { 'name': ['AA', 'IBM'],
+                    'shares': array('q', [100, -50]),
+                    'price': array('d', [-32.2, 91.1]) }
+        with self.assertRaises(ValidationErrors) as cm:
+            stock.Stock.validate_columns(columns)
+        self.assertEqual([ where for where, e in cm.exception.errors ],
+                         [('shares', 1), ('price', 0)])
+        columns['shares'][1] = 50
+        columns['price'][0] = 32.2
+        a = structly.StructureArray.from_columns(stock.Stock, columns)
+        self.assertEqual(a[1], stock.Stock('IBM', 50, 91.1))
+
+    def test_from_tuples(self):
+        a = structly.StructureArray.from_columns(stock.Stock, [('AA', 'IBM'), (100, 50), (32.2, 91.1)])
+        self.assertEqual(a.columns[1], array('q', [100, 50]))
+        a.append(('CAT', 150, 83.44))
+        self.assertEqual(a[2].name, 'CAT')
+
+    @unittest.skipUnless(numpy, 'requires NumPy')
+    def test_numpy_columns(self):
+        shares = numpy.array([100, 50])
+        with self.assertRaises(TypeError):
+            Integer.check(shares[0])
+        with self.assertRaises(ValidationErrors):
+            Integer.check_many(shares)
+        self.assertEqual(PositiveFloat.check_many(numpy.array([1.5])).dtype.kind, 'f')
+        a = structly.StructureArray.from_columns(stock.Stock, [['AA', 'IBM'], shares,
+                                                               numpy.array([32.2, 91.1])])
+        a.append(('CAT', 150, 83.44))
+        self.assertEqual(list(a.columns[1]), [100, 50, 150])
+
+class TestFlatCheck(unittest.TestCase):
+    def test_same_errors(self):
+        from structly.validate import NonEmptyString
+        for validator, value in [ (NonEmptyString, ''), (NonEmptyString, 1),
+                                  (PositiveFloat, -1.0), (PositiveFloat, 1) ]:
+            with self.assertRaises(Exception) as expected:
+                validator.check(value)
+            with self.assertRaises(type(expected.exception)) as cm:
+                validator._flatcheck(value)
+            self.assertEqual(str(cm.exception), str(expected.exception))
+        self.assertEqual(PositiveFloat._flatcheck(1.5), 1.5)
+
+    def test_instance_check(self):
+        class MaxLen(String):
+            def __init__(self, maxlen, name=None):
+                super().__init__(name)
+                self.maxlen = maxlen
+            def check(self, value):
+                value = super().check(value)
+                if len(value) > self.maxlen:
+                    raise ValueError(f'longer than {self.maxlen}')
+                return value
+
+        for options in ({ }, { 'slots': True }, { 'inline_checks': True }):
+            class Item(structly.Structure, **options):
+                name = MaxLen(3)
+            item = Item('abc')
+            item.name = 'ab'
+            with self.assertRaises(ValueError):
+                item.name = 'abcd'
+            with self.assertRaises(TypeError):
+                Item(3)
+        class FrozenItem(structly.FrozenStructure):
+            name = MaxLen(3)
+        with self.assertRaises(ValueError):
+            FrozenItem('abcd')
+        with self.assertRaises(ValidationErrors) as cm:
+            MaxLen(3).check_many(['a', 'abcd', 'b'])
+        self.assertEqual([ index for index, e in cm.exception.errors ], [1])
+        self.assertEqual(len(structly.StructureArray(Item, [('a',), ('bc',)])), 2)
+
+class TestTrusted(unittest.TestCase):
+    def test_trusted(self):
+        with structly.trusted():
+            self.assertEqual(stock.Stock('GOOG', '100', 490.1).shares, '100')
+            s = stock.Stock('GOOG', 100, 490.1)
+            s.shares = -5
+            s.sell(-10)
+            t = SlottedStock.from_row(['GOOG', '100', '-1.5'])
+            f = FrozenStock('GOOG', -100, 490.1)
+            i = InlineStock('GOOG', '100', 490.1)
+        self.assertEqual(s.shares, 5)
+        self.assertEqual(t.price, -1.5)
+        self.assertEqual(f.shares, -100)
+        self.assertEqual(i.shares, '100')
+        with self.assertRaises(TypeError):
+            stock.Stock('GOOG', '100', 490.1)
+        with self.assertRaises(ValueError):
+            s.shares = -5
+        with self.assertRaises(TypeError):
+            s.sell(-10)
+        with self.assertRaises(ValueError):
+            FrozenStock('GOOG', -100, 490.1)
+
+    def test_set_trusted(self):
+        structly.set_trusted(True)
+        try:
+            @validated
+            def double(x: Integer) -> Integer:
+                return x * 2
+            self.assertEqual(double('a'), 'aa')
+        finally:
+            structly.set_trusted(False)
+        with self.assertRaises(TypeError):
+            double('a')
+
+class TestSampled(unittest.TestCase):
+    def test_every(self):
+        class Sample(structly.Structure):
+            shares = PositiveInteger()
+        sampler = Sample.sampled(every=3)
+        values = [ Sample(n).shares for n in [1, '2', 3, '4', -5] ]
+        self.assertEqual(values, [1, '2', 3, '4', -5])
+        self.assertEqual((sampler.checked, sampler.skipped), (1, 4))
+        with self.assertRaises(ValueError):
+            Sample(-6)
+        self.assertTrue(sampler.escalated)
+        with self.assertRaises(TypeError):
+            Sample('7')
+        self.assertEqual((sampler.checked, sampler.failures), (3, 2))
+        Sample.sampled()
+        with self.assertRaises(TypeError):
+            Sample('8')
+
+    def test_budget(self):
+        class Sample(structly.FrozenStructure):
+            shares = PositiveInteger()
+        sampler = Sample.sampled(budget=0.0)
+        self.assertEqual(Sample('1').shares, '1')
+        self.assertEqual(Sample('2').shares, '2')
+        self.assertEqual((sampler.checked, sampler.skipped), (0, 2))
+        sampler = Sample.sampled(budget=1.0)
+        with self.assertRaises(TypeError):
+            Sample('1')
+
+class TestInstrumentation(unittest.TestCase):
+    def test_stats(self):
+        from structly import validate
+        validate.reset_stats()
+        validate.set_instrumented(True)
+        try:
+            s = stock.Stock('GOOG', 100, 490.1)
+            f = FrozenStock('GOOG', 100, 490.1)
+            s.sell(25)
+            with self.assertRaises(TypeError):
+                s.sell('25')
+            with self.assertRaises(ValueError):
+                InlineStock('GOOG', 100, -1.0)
+            stats = validate.get_stats()
+        finally:
+            validate.set_instrumented(False)
+        validators = stats['validators']
+        self.assertEqual(validators['String']['calls'], 2)
+        self.assertEqual(validators['NonEmptyString']['calls'], 1)
+        shares = validators['PositiveInteger']
+        self.assertEqual((shares['calls'], shares['failures']), (6, 1))
+        self.assertEqual(validators['PositiveFloat']['failures'], 1)
+        sell = stats['functions']['stock.Stock.sell']
+        self.assertEqual((sell['calls'], sell['failures']), (2, 1))
+        self.assertIn('stock.Stock.sell calls=2 failures=1', validate.format_stats())
+
+        # Disabled again: nothing more is recorded
+        stock.Stock('GOOG', 100, 490.1)
+        self.assertEqual(validate.get_stats(), stats)
+
+class TestValidated(unittest.TestCase):
+    def test_signature(self):
+        @validated
+        def add(x: Integer, y: Integer = 2, /, *, z: Integer = 3) -> Integer:
+            return x + y + z
+        self.assertEqual(add(1), 6)
+        self.assertEqual(add(1, 1, z=1), 3)
+        self.assertEqual(add.__name__, 'add')
+        with self.assertRaises(TypeError) as cm:
+            add('1', 2, z='3')
+        self.assertEqual(str(cm.exception), "Bad Arguments\n  x: expected <class 'int'>\n  z: expected <class 'int'>")
+        with self.assertRaises(TypeError):
+            add(x=1)
+
+    def test_fallback(self):
+        @enforce(x=Integer, return_=Integer)
+        def first(x, *rest, **kwargs):
+            return x / 2
+        with self.assertRaises(TypeError) as cm:
+            first('1', 2, a=3)
+        self.assertEqual(str(cm.exception), "Bad Arguments\n    x: expected <class 'int'>")
+        with self.assertRaises(TypeError) as cm:
+            first(2, 3)
+        self.assertEqual(str(cm.exception), "Bad return: expected <class 'int'>")
+
+    def test_private_names(self):
+        @validated
+        def _func(x: Integer) -> Integer:
+            return x * 2
+        @validated
+        def _stats(x: Integer):
+            return x
+        self.assertEqual(_func(2), 4)
+        self.assertEqual(_stats(3), 3)
+        self.assertEqual(_func.__name__, '_func')
+        self.assertEqual(_func.__code__.co_name, '_func')
+        with self.assertRaises(TypeError):
+            _func('2')
+
+if __name__ == '__main__':
+    unittest.main()
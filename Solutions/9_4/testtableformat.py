@@ -0,0 +1,157 @@
+# testtableformat.py
+
+import io
+import json
+import struct
+import stock
+import structly
+import unittest
+from contextlib import redirect_stdout
+
+PORTFOLIO = '../../Data/portfolio.csv'
+
+class CountingFile(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        return super().write(text)
+
+class TestFormatters(unittest.TestCase):
+    def setUp(self):
+        self.portfolio = structly.read_csv_as_instances(PORTFOLIO, stock.Stock)[:2]
+
+    def render(self, name, **kwargs):
+        file = io.StringIO()
+        formatter = structly.create_formatter(name, file=file, **kwargs)
+        structly.print_table(self.portfolio, ['name', 'shares', 'price'], formatter)
+        return file.getvalue()
+
+    def test_text(self):
+        self.assertEqual(self.render('text'),
+                         '      name     shares      price\n'
+                         '---------- ---------- ---------- \n'
+                         '        AA        100       32.2\n'
+                         '       IBM         50       91.1\n')
+
+    def test_csv_tsv(self):
+        self.assertEqual(self.render('csv'), 'name,shares,price\nAA,100,32.2\nIBM,50,91.1\n')
+        self.assertEqual(self.render('tsv'), 'name\tshares\tprice\nAA\t100\t32.2\nIBM\t50\t91.1\n')
+
+    def test_html(self):
+        self.assertEqual(self.render('html'),
+                         '<tr> <th>name</th> <th>shares</th> <th>price</th> </tr>\n'
+                         '<tr> <td>AA</td> <td>100</td> <td>32.2</td> </tr>\n'
+                         '<tr> <td>IBM</td> <td>50</td> <td>91.1</td> </tr>\n')
+
+    def test_mixins(self):
+        self.assertEqual(self.render('csv', column_formats=['%s', '%d', '%0.2f'], upper_headers=True),
+                         'NAME,SHARES,PRICE\nAA,100,32.20\nIBM,50,91.10\n')
+
+    def test_row_template(self):
+        formatter = structly.create_formatter('text', column_formats=['%s', '%d', '%0.2f'])
+        formatter.headings(['name', 'shares', 'price'])
+        self.assertEqual(formatter._template, '%10s %10d %10.2f\n')
+        self.assertIsNone(formatter._preformats)
+
+    def test_merged_formats(self):
+        # Merged or not, the output is the same as formatting each value
+        # and then each cell
+        formats = ['%-4s', '%+d', '%05.1f', '%5d', '%r', '%%%s']
+        row = ['AA', 100, 32.2, 50, 'x', 1]
+        formatter = structly.create_formatter('text', column_formats=formats, file=io.StringIO())
+        formatter.headings(list('abcdef'))
+        formatter.row(row)
+        formatter.flush()
+        expected = ' '.join('%10s' % (fmt % value) for fmt, value in zip(formats, row)) + '\n'
+        self.assertEqual(formatter.file.getvalue().splitlines()[-1] + '\n', expected)
+        self.assertEqual(formatter._template, '%10s %+10d %10s %10s %10r %10s\n')
+
+    def test_stdout(self):
+        with redirect_stdout(io.StringIO()) as f:
+            structly.print_table(self.portfolio, ['name'], structly.create_formatter('csv'))
+        self.assertEqual(f.getvalue(), 'name\nAA\nIBM\n')
+
+    def test_column_sources(self):
+        expected = self.render('csv')
+        columns = { 'name': ['AA', 'IBM'], 'shares': [100, 50], 'price': [32.2, 91.1] }
+        self.portfolio = columns
+        self.assertEqual(self.render('csv'), expected)
+        self.portfolio = structly.StructureArray.from_columns(stock.Stock, columns)
+        self.assertEqual(self.render('csv'), expected)
+        self.portfolio = structly.StructureArray.read_csv(stock.Stock, PORTFOLIO)[:2]
+        self.assertEqual(self.render('csv'), expected)
+
+    def test_single_field(self):
+        file = io.StringIO()
+        structly.print_table(self.portfolio, ['name'], structly.create_formatter('text', file=file))
+        self.assertEqual(file.getvalue().splitlines()[2:], ['        AA', '       IBM'])
+
+    def test_no_fields(self):
+        file = io.StringIO()
+        structly.print_table(self.portfolio, [], structly.create_formatter('csv', file=file))
+        self.assertEqual(file.getvalue(), '\n\n\n')
+
+    def test_jsonl(self):
+        lines = self.render('jsonl').splitlines()
+        self.assertEqual(lines[0], json.dumps({'name': 'AA', 'shares': 100, 'price': 32.2}))
+        self.assertEqual([ json.loads(line)['name'] for line in lines ], ['AA', 'IBM'])
+        lines = self.render('jsonl', column_formats=['%s', '%d', '%0.2f']).splitlines()
+        self.assertEqual(json.loads(lines[0])['price'], '32.20')
+        values = ['a"\u00e9', 1, -2.5, float('nan'), True, None, [1]]
+        file = io.StringIO()
+        formatter = structly.create_formatter('jsonl', file=file)
+        formatter.headings(list('abcdefg'))
+        formatter.row(values)
+        formatter.flush()
+        self.assertEqual(file.getvalue(), json.dumps(dict(zip('abcdefg', values))) + '\n')
+
+    def test_binary(self):
+        for options in ({ 'cls': stock.Stock }, { 'types': [str, int, float] }, { }):
+            file = io.BytesIO()
+            formatter = structly.create_formatter('binary', file=file, strsize=8, **options)
+            structly.print_table(self.portfolio, ['name', 'shares', 'price'], formatter)
+            self.assertEqual(formatter.struct.format, '<8sqd')
+            self.assertEqual(list(struct.iter_unpack('<8sqd', file.getvalue())),
+                             [(b'AA\0\0\0\0\0\0', 100, 32.2), (b'IBM\0\0\0\0\0', 50, 91.1)])
+        with self.assertRaises(TypeError):
+            structly.create_formatter('binary', types=[list]).headings(['x'])
+
+        # Strings must fit in strsize bytes once encoded
+        formatter = structly.create_formatter('binary', file=io.BytesIO(), types=[str], strsize=4)
+        formatter.headings(['name'])
+        formatter.row(['\u00e9\u00e9'])
+        with self.assertRaises(ValueError):
+            formatter.row(['a\u00e9\u00e9'])
+
+    def test_buffering(self):
+        file = CountingFile()
+        formatter = structly.create_formatter('csv', file=file, bufsize=1000)
+        structly.print_table(self.portfolio * 100, ['name', 'shares'], formatter)
+        self.assertEqual(file.getvalue().count('\n'), 201)
+        self.assertLess(file.writes, 5)
+
+    def test_flush_on_error(self):
+        def records():
+            yield from self.portfolio
+            raise TypeError('bad record')
+        file = io.StringIO()
+        with self.assertRaises(TypeError):
+            structly.print_table(records(), ['name'], structly.create_formatter('csv', file=file))
+        self.assertEqual(file.getvalue(), 'name\nAA\nIBM\n')
+
+    def test_unbuffered(self):
+        # Each row is written as soon as the record arrives
+        file = CountingFile()
+        formatter = structly.create_formatter('csv', file=file, bufsize=0)
+        def records():
+            for n, s in enumerate(self.portfolio, start=1):
+                yield s
+                self.assertEqual(file.getvalue().count('\n'), n + 1)
+        structly.print_table(records(), ['name'], formatter)
+        self.assertEqual(file.getvalue(), 'name\nAA\nIBM\n')
+
+if __name__ == '__main__':
+    unittest.main()
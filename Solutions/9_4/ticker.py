@@ -0,0 +1,24 @@
+# ticker.py
+
+from structly import *
+
+class Ticker(Structure):
+    name = String()
+    price = Float()
+    date = String()
+    time = String()
+    change = Float()
+    open = Float()
+    high = Float()
+    low = Float()
+    volume = Integer()
+
+if __name__ == '__main__':
+    # Usage: tail -f ../../Data/stocklog.csv | python ticker.py
+    import sys
+    # Fully validate 1 in 100 records (all of them after a bad one)
+    Ticker.sampled(every=100)
+    records = iter_csv_as_instances(sys.stdin, Ticker, headers=list(Ticker._fields),
+                                    where=[('change', '<', 0)])
+    # Unbuffered, so each row shows up as soon as it arrives
+    print_table(records, ['name','price','change'], create_formatter('text', bufsize=0))